@@ -0,0 +1,165 @@
+import os
+from collections import OrderedDict
+
+import pygame
+
+# Process-wide caches for decoded and derived sprites.
+# Surfaces handed out from here are shared: callers must copy before drawing
+# onto them.
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), 'assets')
+
+TINT_CACHE_SIZE = 2048 # ~3 car variants per hue degree with room to spare
+ROTATION_CACHE_SIZE = 4096 # small car sprites, a few KB each
+TEXT_CACHE_BYTES = 16 * 1024 * 1024
+
+
+class LRUCache:
+    """Dict-like cache that evicts the least recently used entries.
+
+    Capacity counts entries, or whatever ``sizeof`` returns for each value.
+    """
+    def __init__(self, max_size, sizeof=None):
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.size = 0
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _cost(self, value):
+        return self.sizeof(value) if self.sizeof else 1
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= self._cost(old)
+        self.entries[key] = value
+        self.size += self._cost(value)
+        while self.size > self.max_size and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= self._cost(evicted)
+        return value
+
+    def discard(self, predicate):
+        """Drop every entry whose key matches predicate."""
+        for key in [k for k in self.entries if predicate(k)]:
+            self.size -= self._cost(self.entries.pop(key))
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+
+def surface_bytes(surface):
+    w, h = surface.get_size()
+    return w * h * surface.get_bytesize()
+
+
+_decoded = {} # filename -> surface, one decode per file per process
+_tinted = LRUCache(TINT_CACHE_SIZE)
+_rotated = LRUCache(ROTATION_CACHE_SIZE)
+_text = LRUCache(TEXT_CACHE_BYTES, sizeof=surface_bytes)
+_markers = LRUCache(TINT_CACHE_SIZE)
+
+
+def load_image(filename):
+    image = _decoded.get(filename)
+    if image is None:
+        path = os.path.join(ASSETS_DIR, filename)
+        if os.path.exists(path):
+            image = pygame.image.load(path).convert_alpha()
+        else:
+            # Fallback surface if file missing
+            image = pygame.Surface((30, 30))
+            image.fill((200, 50, 50))
+        _decoded[filename] = image
+    return image
+
+
+def get_tinted(filename, size, color):
+    """Scaled copy of an asset multiplied by color, memoized per (file, size, color)."""
+    color = tuple(color)
+    key = (filename, size, color)
+    image = _tinted.get(key)
+    if image is None:
+        image = pygame.transform.scale(load_image(filename), size)
+        color_surf = pygame.Surface(size).convert_alpha()
+        color_surf.fill(color)
+        image.blit(color_surf, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+        _tinted.put(key, image)
+    return image
+
+
+def get_marker(color, radius):
+    """Small outlined dot standing in for a car at low detail, memoized per (color, radius)."""
+    color = tuple(color)
+    key = (color, radius)
+    marker = _markers.get(key)
+    if marker is None:
+        marker = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(marker, (0, 0, 0), (radius, radius), radius)
+        pygame.draw.circle(marker, color, (radius, radius), radius - 1)
+        marker = _markers.put(key, marker.convert_alpha())
+    return marker
+
+
+def blit_batch(surface, sequence):
+    """Blit (image, dest) pairs in one call; fblits where pygame has it."""
+    fblits = getattr(surface, 'fblits', None)
+    if fblits is not None:
+        fblits(sequence)
+    else:
+        surface.blits(sequence, doreturn=False)
+
+
+def get_rotated(image, angle):
+    """pygame.transform.rotate memoized per image and 1 degree angle bucket."""
+    # The surface itself is part of the key so it can't be freed and have
+    # its id reused while entries for it are cached.
+    key = (image, int(round(angle)) % 360)
+    rotated = _rotated.get(key)
+    if rotated is None:
+        rotated = _rotated.put(key, pygame.transform.rotate(image, key[1]))
+    return rotated
+
+
+def warm_rotations(images, angles):
+    """Pre-rotate images to the given angles, stopping before the cache would evict."""
+    for image in images:
+        for angle in angles:
+            if len(_rotated) >= ROTATION_CACHE_SIZE:
+                return
+            get_rotated(image, angle)
+
+
+def render_text(font, text, color):
+    """font.render(text, True, color) memoized per (font, text, color)."""
+    key = (font, text, tuple(color))
+    surf = _text.get(key)
+    if surf is None:
+        surf = _text.put(key, font.render(text, True, color))
+    return surf
+
+
+def invalidate_text(texts=None):
+    """Forget cached renders of one string or a collection of them, or of every string."""
+    if texts is None:
+        _text.clear()
+    else:
+        texts = {texts} if isinstance(texts, str) else set(texts)
+        _text.discard(lambda key: key[1] in texts)
+
+
+def clear_sprites():
+    """Forget every tinted, rotated and marker sprite (decoded files are kept)."""
+    _tinted.clear()
+    _rotated.clear()
+    _markers.clear()
@@ -0,0 +1,97 @@
+import os
+
+import pygame
+
+# Sound effects on a fixed set of reserved mixer channels.
+# Each effect owns a few channels (its voice limit) and has a minimum gap
+# between plays, so a pile-up of crashes in one frame plays a couple of
+# sounds instead of queueing dozens of mixes. Sounds are decoded on first
+# use, or up front with preload() from a loader thread.
+
+SOUNDS_DIR = os.path.join(os.path.dirname(__file__), 'sound_effects')
+MUSIC_FILE = 'background-music.mp3'
+
+# name: (file, volume before sound_effects_volume, voices, min ms between plays)
+EFFECTS = {
+    'crash': ('car-crashed.wav', 0.4, 3, 120),
+    'boost': ('car-boosted.wav', 0.4, 3, 120),
+    'countdown': ('countdown.wav', 1.0, 1, 0),
+    'start': ('car-starting.wav', 1.0, 1, 0),
+    'finish': ('finish-race.wav', 1.0, 1, 0),
+}
+
+
+class SoundManager:
+    def __init__(self, settings, sounds_dir=SOUNDS_DIR):
+        self.sounds_dir = sounds_dir
+        self.effects_volume = settings.get("sound_effects_volume", 1.0)
+        self.music_volume = settings.get("background_music_volume", 0.3)
+        self.sounds = {} # name -> Sound, or None if it couldn't be loaded
+        self.last_played = {}
+        self.channels = {}
+
+        self.enabled = pygame.mixer.get_init() is not None
+        if not self.enabled:
+            print("Audio unavailable; sound effects disabled")
+            return
+
+        # Reserve one block of channels per effect, so effects can't starve
+        # each other and nothing else can grab them
+        reserved = sum(voices for _, _, voices, _ in EFFECTS.values())
+        if pygame.mixer.get_num_channels() < reserved:
+            pygame.mixer.set_num_channels(reserved)
+        pygame.mixer.set_reserved(reserved)
+        first = 0
+        for name, (_, _, voices, _) in EFFECTS.items():
+            self.channels[name] = [pygame.mixer.Channel(i) for i in range(first, first + voices)]
+            first += voices
+
+    def get_sound(self, name):
+        if name not in self.sounds:
+            filename, volume, _, _ = EFFECTS[name]
+            path = os.path.join(self.sounds_dir, filename)
+            sound = None
+            if os.path.exists(path):
+                try:
+                    sound = pygame.mixer.Sound(path)
+                    sound.set_volume(volume * self.effects_volume)
+                except Exception as e:
+                    print(f"Failed to load {name} sound: {e}")
+            self.sounds[name] = sound
+        return self.sounds[name]
+
+    def preload(self):
+        if self.enabled:
+            for name in EFFECTS:
+                self.get_sound(name)
+
+    def play(self, name):
+        """Play an effect on a free channel of its own; dropped if all are busy or it played too recently."""
+        if not self.enabled:
+            return
+        now = pygame.time.get_ticks()
+        if now - self.last_played.get(name, -1e9) < EFFECTS[name][3]:
+            return
+        sound = self.get_sound(name)
+        if sound is None:
+            return
+        for channel in self.channels[name]:
+            if not channel.get_busy():
+                channel.play(sound)
+                self.last_played[name] = now
+                return
+
+    def play_music(self):
+        path = os.path.join(self.sounds_dir, MUSIC_FILE)
+        if not self.enabled or not os.path.exists(path):
+            return
+        try:
+            pygame.mixer.music.load(path)
+            pygame.mixer.music.set_volume(self.music_volume)
+            pygame.mixer.music.play(-1)
+        except Exception as e:
+            print(f"Failed to play background music: {e}")
+
+    def stop_music(self):
+        if self.enabled:
+            pygame.mixer.music.stop()
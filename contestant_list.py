@@ -0,0 +1,145 @@
+from bisect import bisect_left
+
+import pygame
+
+from asset_cache import invalidate_text, render_text
+
+# Scrollable, searchable contestant panel for the start menu.
+# Only the rows in view are ever rendered, row surfaces come from the shared
+# text cache (asset_cache.render_text), and the whole panel is composed into
+# one surface that is rebuilt only when the scroll position, the query or the
+# names change.
+
+ROW_HEIGHT = 20
+HEADER_HEIGHT = 50 # Title line above the rows
+SEARCH_HEIGHT = 30 # Search box under the title
+PANEL_COLOR = (30, 30, 30)
+ROW_COLOR = (200, 200, 200)
+HINT_COLOR = (120, 120, 120)
+
+
+class SearchIndex:
+    """Sorted prefix index over every word of every name.
+
+    Each name is indexed once per word (from that word to the end), so
+    "hoa" finds "Nguyen Thi Hong Hoa" as well as "Hoang Van An". Lookups
+    are two bisects; a query that extends the previous one only searches
+    inside the previous range.
+    """
+    def __init__(self, names):
+        entries = []
+        for i, name in enumerate(names):
+            folded = name.casefold()
+            start = 0
+            for word in folded.split():
+                start = folded.index(word, start)
+                entries.append((folded[start:], i))
+                start += len(word)
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.rows = [i for _, i in entries]
+        self.last = ('', 0, len(self.keys))
+
+    def search(self, query):
+        """Row indices whose name has a word starting with query, in list order."""
+        query = query.casefold()
+        last_query, lo, hi = self.last
+        if not query.startswith(last_query):
+            lo, hi = 0, len(self.keys)
+        lo = bisect_left(self.keys, query, lo, hi)
+        hi = bisect_left(self.keys, query + '\U0010ffff', lo, hi)
+        self.last = (query, lo, hi)
+        return sorted(set(self.rows[lo:hi]))
+
+
+class ContestantList:
+    def __init__(self, rect, font, header_font):
+        self.rect = pygame.Rect(rect)
+        self.font = font
+        self.header_font = header_font
+        self.row_texts = set() # Row strings rendered for the current names
+        self.surface = None # Composed panel; None when it needs redrawing
+        self.set_names([])
+
+    def set_names(self, names):
+        self.names = list(names)
+        self.index = SearchIndex(self.names)
+        # Rows are numbered, so the old list's row strings are stale. Nothing
+        # has been rendered yet when the loader thread sets the first names
+        if self.row_texts:
+            invalidate_text(self.row_texts)
+            self.row_texts = set()
+        self.query = ''
+        self.matches = None # Row indices shown; None shows every name
+        self.scroll_y = 0
+        self.surface = None
+
+    @property
+    def list_height(self):
+        return max(0, self.rect.height - HEADER_HEIGHT - SEARCH_HEIGHT)
+
+    def shown(self):
+        return len(self.names) if self.matches is None else len(self.matches)
+
+    def scroll(self, dy):
+        max_scroll = max(0, self.shown() * ROW_HEIGHT - self.list_height)
+        scroll_y = max(0, min(self.scroll_y + dy, max_scroll))
+        if scroll_y != self.scroll_y:
+            self.scroll_y = scroll_y
+            self.surface = None
+
+    def set_query(self, query):
+        self.query = query
+        self.matches = self.index.search(query) if query else None
+        self.scroll_y = 0
+        self.surface = None
+
+    def handle_event(self, event):
+        """Scroll with the wheel over the panel; type to search, Backspace/Escape to edit."""
+        if event.type == pygame.MOUSEWHEEL:
+            if self.rect.collidepoint(pygame.mouse.get_pos()):
+                self.scroll(-event.y * ROW_HEIGHT)
+        elif event.type == pygame.TEXTINPUT:
+            self.set_query(self.query + event.text)
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_BACKSPACE and self.query:
+                self.set_query(self.query[:-1])
+            elif event.key == pygame.K_ESCAPE and self.query:
+                self.set_query('')
+
+    def get_row(self, i):
+        text = f"{i+1}. {self.names[i]}"
+        self.row_texts.add(text)
+        return render_text(self.font, text, ROW_COLOR)
+
+    def render(self):
+        surf = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        pygame.draw.rect(surf, PANEL_COLOR, surf.get_rect(), border_radius=5)
+        surf.blit(render_text(self.header_font, f"Contestants ({len(self.names)})", (255, 255, 255)), (10, 10))
+
+        # Search box
+        box = pygame.Rect(10, HEADER_HEIGHT - 5, self.rect.width - 20, SEARCH_HEIGHT - 6)
+        pygame.draw.rect(surf, (50, 50, 50), box, border_radius=3)
+        if self.query:
+            text = render_text(self.font, f"{self.query}  ({self.shown()} found)", (255, 255, 255))
+        else:
+            text = render_text(self.font, "Type to search...", HINT_COLOR)
+        surf.blit(text, (box.x + 6, box.y + (box.height - text.get_height()) // 2))
+
+        if not self.list_height:
+            return surf
+
+        # Only the rows that intersect the list area
+        top = HEADER_HEIGHT + SEARCH_HEIGHT
+        first = self.scroll_y // ROW_HEIGHT
+        last = min(self.shown(), (self.scroll_y + self.list_height) // ROW_HEIGHT + 1)
+        list_surf = surf.subsurface((0, top, self.rect.width, self.list_height))
+        for n in range(first, last):
+            i = n if self.matches is None else self.matches[n]
+            list_surf.blit(self.get_row(i), (10, n * ROW_HEIGHT - self.scroll_y))
+        return surf
+
+    def draw(self, screen):
+        if self.surface is None:
+            self.surface = self.render()
+        screen.blit(self.surface, self.rect)
@@ -1,13 +1,27 @@
 import pygame
-import csv
-import random
 import sys
-import math
 import os
 import json
-from racer import Racer
+import time
+import threading
+import traceback
+import numpy as np
+from racer import Racer, MARKER_RADIUS
+from audio import SoundManager
+from contestant_list import ContestantList
+from asset_cache import get_rotated, warm_rotations, render_text, blit_batch
+from race_engine import RaceSimulation, TICK_MS, ROSTER_STREAM, deal, lane_count, run_heats, stream_seed
+from race_log import RaceRecorder, RaceLog, RaceReplay, KEYFRAME_TICKS
+from photo_loader import load_photos, CACHE_DIR as PHOTO_CACHE_DIR
+from roster import file_hash, load_roster, CACHE_DIR as ROSTER_CACHE_DIR
+from track import Track
+from track_texture import TrackTexture
 # --- Configuration ---
 FPS = 60
+MAX_FRAME_MS = 250 # Longer frames are only partly caught up so the sim can't spiral
+REPLAY_SPEEDS = (0.25, 0.5, 1, 2, 4, 8, 16)
+REPLAY_SKIP_TICKS = 5 * FPS # Left/Right jump in a replay
+REPLAY_LEAD_IN_TICKS = 3 * FPS # F starts this long before the winner crosses the line
 
 # Colors
 WHITE = (255, 255, 255)
@@ -25,7 +39,7 @@ MIN_SPEED = 5
 MAX_SPEED = 20
 
 ASSETS_DIR = os.path.join(os.path.dirname(__file__), 'assets')
-SOUNDS_DIR = os.path.join(os.path.dirname(__file__), 'sound_effects')
+RACE_LOG_DIR = os.path.join(os.path.dirname(__file__), 'race_logs')
 
 
 def load_image(filename):
@@ -39,7 +53,7 @@ def load_image(filename):
         return surf
 
 class Game:
-    def __init__(self):
+    def __init__(self, replay_path=None):
         pygame.init()
         self.settings = self.load_settings()
         self.screen_width = self.settings.get("screen_width", 1920)
@@ -53,6 +67,58 @@ class Game:
         self.large_font = pygame.font.SysFont("Arial", 64)
         self.winner_font = pygame.font.SysFont("Arial", 120)  # Bigger font for winner
         
+        self.state = "LOADING" # LOADING, START_MENU, HEATS, COUNTDOWN, RACING, FINISHED, REPLAY
+        self.loading_stage = "Starting"
+        self.loading_progress = 0.0
+        self.loading_error = None
+        self.track_ready = False # Set once the track is built; Start waits for it
+
+        self.racers = []
+        self.camera_offset = [0, 0]
+        self.zoom_level = 1.0
+        self.race = None # RaceSimulation driving the current race
+        self.recorder = None # RaceRecorder streaming it to disk
+        self.winner = None
+        self.finished_racers = []
+        self.pending_replay = replay_path # Log to play once loading is done
+        self.replay_return = None # What to restore when a replay is closed
+        self.replay_bar = pygame.Rect(100, self.screen_height - 60, self.screen_width - 200, 16)
+
+        # Offscreen surfaces reused across frames (see get_render_target)
+        self.render_targets = {}
+        self.zoom_frame_key = None
+
+        # Show something straight away; images, sounds and the track are
+        # loaded on a worker thread while the main loop draws progress
+        self.draw_loading()
+        self.loader = threading.Thread(target=self.load_assets, daemon=True)
+        self.loader.start()
+
+    def set_loading(self, stage, progress):
+        self.loading_stage = stage
+        self.loading_progress = progress
+
+    def load_assets(self):
+        # Runs on the loader thread. The menu opens as soon as its own assets
+        # are in; the track keeps building behind it.
+        try:
+            self.load_menu_assets()
+            self.state = "START_MENU"
+            self.load_race_assets()
+            self.set_loading("Ready", 1.0)
+            self.track_ready = True
+        except Exception as e:
+            traceback.print_exc()
+            self.loading_error = f"Failed to load: {e}"
+
+    def wait_until_loaded(self):
+        """Block until the loader thread is done (headless tools and tests)."""
+        self.loader.join()
+        if self.loading_error:
+            raise RuntimeError(self.loading_error)
+
+    def load_menu_assets(self):
+        self.set_loading("Loading images", 0.05)
         self.finish_texture = load_image('finish_line.png')
         self.background_texture = load_image('background.png') # Load background
         self.road_texture = load_image('road.png') # Load road texture
@@ -60,50 +126,6 @@ class Game:
         self.banner_texture = load_image('siewalk_banner.png') # Load banner texture
         self.start_texture = load_image('start_line.png') # Load start line texture
 
-        # Load Sounds
-        self.crash_sound = None
-        self.boost_sound = None
-        
-        if os.path.exists(os.path.join(SOUNDS_DIR, 'car-crashed.wav')):
-            try:
-                self.crash_sound = pygame.mixer.Sound(os.path.join(SOUNDS_DIR, 'car-crashed.wav'))
-                self.crash_sound.set_volume(0.4)
-            except Exception as e:
-                print(f"Failed to load crash sound: {e}")
-
-        if os.path.exists(os.path.join(SOUNDS_DIR, 'car-boosted.wav')):
-            try:
-                self.boost_sound = pygame.mixer.Sound(os.path.join(SOUNDS_DIR, 'car-boosted.wav'))
-                self.boost_sound.set_volume(0.4)
-            except Exception as e:
-                print(f"Failed to load boost sound: {e}")
-
-        self.countdown_sound = None
-        self.start_sound = None
-        self.finish_sound = None
-
-        if os.path.exists(os.path.join(SOUNDS_DIR, 'countdown.wav')):
-            try:
-                self.countdown_sound = pygame.mixer.Sound(os.path.join(SOUNDS_DIR, 'countdown.wav'))
-            except Exception as e:
-                print(f"Failed to load countdown sound: {e}")
-
-        if os.path.exists(os.path.join(SOUNDS_DIR, 'car-starting.wav')):
-            try:
-                self.start_sound = pygame.mixer.Sound(os.path.join(SOUNDS_DIR, 'car-starting.wav'))
-            except Exception as e:
-                print(f"Failed to load car-starting sound: {e}")
-
-        if os.path.exists(os.path.join(SOUNDS_DIR, 'finish-race.wav')):
-            try:
-                self.finish_sound = pygame.mixer.Sound(os.path.join(SOUNDS_DIR, 'finish-race.wav'))
-            except Exception as e:
-                print(f"Failed to load finish-race sound: {e}")
-
-        self.bg_music_path = os.path.join(SOUNDS_DIR, 'background-music.mp3')
-        if not os.path.exists(self.bg_music_path):
-            self.bg_music_path = None
-
         # Load Close Button
         self.close_btn = load_image('button-close.png')
         # Scale to a reasonable size
@@ -121,6 +143,8 @@ class Game:
         scale = target_w / sw
         self.start_btn_img = pygame.transform.scale(self.start_btn_img, (int(sw * scale), int(sh * scale)))
         self.start_btn_rect = self.start_btn_img.get_rect(center=(self.screen_width//2, self.screen_height//2))
+        self.start_btn_dim = self.start_btn_img.copy()
+        self.start_btn_dim.fill((255, 255, 255, 90), special_flags=pygame.BLEND_RGBA_MULT)
 
         self.restart_btn_img = load_image('button-restart_race.png')
         rw, rh = self.restart_btn_img.get_size()
@@ -128,23 +152,20 @@ class Game:
         self.restart_btn_img = pygame.transform.scale(self.restart_btn_img, (int(rw * scale), int(rh * scale)))
         self.restart_btn_rect = self.restart_btn_img.get_rect(center=(self.screen_width//2, self.screen_height - 150))
 
+        self.set_loading("Loading contestants", 0.15)
         self.contestants = self.load_contestants("contestants.csv")
-        self.racers = []
-        
-        # Calculate dynamic track width based on contestant count
-        # Ensure enough space for at least 50 racers
-        self.track_width = max(340, len(self.contestants) * 15)
-        self.drivable_width = self.track_width - 40
 
-        self.state = "START_MENU" # START_MENU, RACING, FINISHED
-        self.scroll_y = 0  # Scroll position for contestant list
-        
-        self.track_points = self.generate_track_points()
-        self.camera_offset = [0, 0]
-        self.zoom_level = 1.0
+        # Sidebar list on the start menu; only redrawn when it changes
+        self.contestant_list = ContestantList((50, 200, 300, self.screen_height - 250), self.font, self.ui_font)
+        self.contestant_list.set_names(self.contestants)
+
+    def load_race_assets(self):
+        self.set_loading("Loading sounds", 0.2)
+        # Pooled, rate-limited effect channels; decoding here keeps it off the main thread
+        self.audio = SoundManager(self.settings)
+        self.audio.preload()
 
-        # Shadows & Obstacles
-        self.obstacles = [] # list of dicts: {progress, lane, image, x, y}
+        # Obstacles (positions come from the race engine)
         self.obstacle_images = []
         obs_dir = os.path.join(ASSETS_DIR, 'random_obstacle')
         
@@ -160,7 +181,6 @@ class Game:
                      self.obstacle_images.append(img)
 
         # Boosters
-        self.boosters = [] # list of dicts: {progress, lane, image, x, y}
         self.booster_images = []
         boost_dir = os.path.join(ASSETS_DIR, 'random_booster')
         boost_size = self.settings.get("booster_size", 40)
@@ -173,272 +193,65 @@ class Game:
                      self.booster_images.append(img)
 
         # Load random photos
+        self.set_loading("Loading photos", 0.4)
         self.random_photos = self.load_random_photos()
 
-        # Generate Full Track Surface
-        print("Generating track texture...")
-        self.track_surface = self.generate_full_track_texture()
+        self.set_loading("Building track", 0.7)
+        # Track width grows with the lane count (see track.Track); big fields share lanes
+        self.build_track(lane_count(len(self.contestants), self.settings), wait=True)
+
+    def build_track(self, num_lanes, wait=False):
+        self.track = Track(self.screen_height, num_lanes)
+        self.track_width = self.track.track_width
+        self.drivable_width = self.track.drivable_width
+        self.track_points = self.track.points
+
+        # Start/finish lines never move, so scale and rotate them once
+        self.decorations = self.build_decorations()
+
+        # Track texture tiles are composed lazily as the camera reaches them,
+        # or read back from the on-disk cache of an earlier launch
+        track_assets = [os.path.join(ASSETS_DIR, f) for f in ('road.png', 'sidewalk.png', 'siewalk_banner.png')]
+        self.track_texture = TrackTexture(self.track, self.settings, self.screen_height,
+                                          self.road_texture, self.sidewalk_texture,
+                                          self.banner_texture, self.random_photos,
+                                          asset_paths=track_assets + self.random_photo_paths)
+
+        # Queue the tiles around the start line now rather than on the first
+        # frame of the countdown; wait blocks until they're in (loader thread)
+        sx, sy, _ = self.get_track_position(0, 0, 1)
+        self.track_texture.warm(sx - self.screen_width * 0.4, self.screen_width, wait=wait)
 
     def load_random_photos(self):
         photos = []
+        self.random_photo_paths = []
         photos_dir = os.path.join(ASSETS_DIR, 'random_photos')
         if os.path.exists(photos_dir):
-            for f in os.listdir(photos_dir):
-                if f.lower().endswith(('.png', '.jpg', '.jpeg')):
-                     try:
-                         # Load and scale down a bit if too large
-                         img = pygame.image.load(os.path.join(photos_dir, f)).convert_alpha()
-                         w, h = img.get_size()
-                         target_size = self.settings.get("random_photos_max_size", 600)
-                         if w > target_size or h > target_size:
-                            scale = target_size / max(w, h)
-                            img = pygame.transform.scale(img, (int(w * scale), int(h * scale)))
-                         photos.append(img)
-                     except Exception as e:
-                         print(f"Failed to load photo {f}: {e}")
+            # Sorted so the seeded track layout doesn't depend on directory order
+            paths = [os.path.join(photos_dir, f) for f in sorted(os.listdir(photos_dir))
+                     if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
+            # Decoded and scaled down on worker threads, or read from the thumbnail cache
+            target_size = self.settings.get("random_photos_max_size", 600)
+            for path, img in load_photos(paths, target_size,
+                                         workers=self.settings.get("photo_workers"),
+                                         cache_dir=self.settings.get("photo_cache_dir", PHOTO_CACHE_DIR)):
+                photos.append(img)
+                self.random_photo_paths.append(path)
         return photos
 
-    def generate_full_track_texture(self):
-        # Determine bounds
-        max_x = 15000 + 500
-        # Increase height to avoid clipping. Add padding.
-        Y_PADDING = 800
-        height = self.screen_height + 2 * Y_PADDING
-        
-        # 1. Create Tiled Road Texture
-        # We make a surface large enough to hold the track
-        road_surf = pygame.Surface((max_x, height), pygame.SRCALPHA)
-        
-        # Tile the road texture across the entire surface
-        # Assuming road_texture is seamlessly tileable
-        rw, rh = self.road_texture.get_size()
-        for x in range(0, max_x, rw):
-            for y in range(0, height, rh):
-                road_surf.blit(self.road_texture, (x, y))
-
-        # 1b. Create Tiled Sidewalk Texture
-        sidewalk_surf = pygame.Surface((max_x, height), pygame.SRCALPHA)
-        sw, sh = self.sidewalk_texture.get_size()
-        for x in range(0, max_x, sw):
-            for y in range(0, height, sh):
-                # Tint slightly for variety? Optional.
-                sidewalk_surf.blit(self.sidewalk_texture, (x, y))
-
-        # 1c. Create Banner Layer (Placed along track)
-        banner_layer = pygame.Surface((max_x, height), pygame.SRCALPHA)
-        
-        # Logic to place banners along the spline
-        track_width = self.track_width
-        road_radius = int(track_width / 2)
-        sidewalk_width_extra = 40
-        sidewalk_radius = road_radius + sidewalk_width_extra
-        
-        # --- Sprinkle Random Photos ---
-        if self.random_photos:
-            photo_layer = pygame.Surface((max_x, height), pygame.SRCALPHA)
-            # We will walk along the track and randomly place photos
-            # Similar to banner logic but purely random
-            
-            p_points = self.track_points
-            offset_val = self.settings.get("random_photos_offset", 30)
-            safe_dist = sidewalk_radius + offset_val # Minimum distance from center
-            max_dist = safe_dist + 300 # Maximum distance from center
-            
-            # Use accumulated distance to space them out somewhat evenly or just random?
-            # User said "sprinkle ... can be at random location"
-            # Let's place one every ~200-500 pixels of track length
-            
-            freq_base = self.settings.get("random_photos_interval", self.settings.get("random_photos_frequency", 500))
-            # Ensure safe bounds
-            if freq_base < 50: freq_base = 50
-
-            current_dist = 0
-            next_photo_dist = random.randint(int(freq_base * 0.5), int(freq_base * 1.5))
-            
-            for i in range(0, len(p_points) - 1):
-                p1 = p_points[i]
-                p2 = p_points[i+1]
-                
-                seg_dx = p2[0] - p1[0]
-                seg_dy = p2[1] - p1[1]
-                seg_len = math.sqrt(seg_dx*seg_dx + seg_dy*seg_dy)
-                
-                current_dist += seg_len
-                
-                if current_dist >= next_photo_dist:
-                    current_dist = 0
-                    next_photo_dist = random.randint(int(freq_base * 0.5), int(freq_base * 1.5)) # Space them out
-                    
-                    # Place a photo
-                    photo = random.choice(self.random_photos)
-                    
-                    # Random rotation and scale variation
-                    base_scale = self.settings.get("random_photos_scale", 1.0)
-                    scale_var = random.uniform(0.8, 1.2) * base_scale
-                    w, h = photo.get_size()
-                    t_photo = pygame.transform.scale(photo, (int(w * scale_var), int(h * scale_var)))
-                    # t_photo = pygame.transform.rotate(t_photo, random.randint(0, 360)) # No rotation requested
-                    
-                    # Calculate position
-                    # Random side
-                    side = 1 if random.random() > 0.5 else -1
-                    dist = random.uniform(safe_dist, max_dist)
-                    
-                    angle = math.atan2(seg_dy, seg_dx)
-                    perp_angle = angle + math.pi / 2
-                    
-                    draw_x = p1[0]
-                    draw_y = p1[1] + Y_PADDING
-                    
-                    px = draw_x + math.cos(perp_angle) * dist * side
-                    py = draw_y + math.sin(perp_angle) * dist * side
-                    
-                    p_rect = t_photo.get_rect(center=(int(px), int(py)))
-                    
-                    # Blit to banner_layer (which is the bottom layer for props)
-                    banner_layer.blit(t_photo, p_rect)
-
-        # Place banner center right at the edge of the sidewalk
-        # Drawing order will hide the inner half
-        offset_dist = sidewalk_radius + 15 # Slight text offset
-        
-        banner_dist_setting = self.settings.get("banner_distance", 50)
-        banner_scale_setting = self.settings.get("banner_scale", 1.0)
-        
-        # Scale the banner texture
-        bw, bh = self.banner_texture.get_size()
-        scaled_banner = pygame.transform.scale(self.banner_texture, (int(bw * banner_scale_setting), int(bh * banner_scale_setting)))
-        
-        points = self.track_points
-        # Step through points. If points are 50px apart, we render a banner at each or interpolate.
-        
-        accumulated_dist = 0
-        last_banner_dist = -banner_dist_setting # Force first one to draw? Or start at 0
-        
-        for i in range(0, len(points) - 1):
-            p1 = points[i]
-            p2 = points[i+1]
-            
-            # Distance of this segment
-            seg_dx = p2[0] - p1[0]
-            seg_dy = p2[1] - p1[1]
-            seg_len = math.sqrt(seg_dx*seg_dx + seg_dy*seg_dy)
-            
-            accumulated_dist += seg_len
-            
-            if accumulated_dist - last_banner_dist >= banner_dist_setting:
-                last_banner_dist = accumulated_dist
-                
-                # Midpoint for smoother placement (or p1)
-                # Using p1 since we just crossed threshold
-                
-                # Angle of segment
-                angle = math.atan2(seg_dy, seg_dx)
-                perp_angle = angle + math.pi / 2
-                
-                # Draw coords (add Padding)
-                draw_x = p1[0]
-                draw_y = p1[1] + Y_PADDING
-                
-                # Rotate banner (Convert radians to degrees, negative for pygame)
-                deg = -math.degrees(angle)
-                rot_img = pygame.transform.rotate(scaled_banner, deg)
-                
-                # Left Side Banner
-                lx = draw_x + math.cos(perp_angle) * offset_dist
-                ly = draw_y + math.sin(perp_angle) * offset_dist
-                l_rect = rot_img.get_rect(center=(int(lx), int(ly)))
-                banner_layer.blit(rot_img, l_rect)
-                
-                # Right Side Banner
-                rx = draw_x - math.cos(perp_angle) * offset_dist
-                ry = draw_y - math.sin(perp_angle) * offset_dist
-                r_rect = rot_img.get_rect(center=(int(rx), int(ry)))
-                banner_layer.blit(rot_img, r_rect)
-        
-        # 2. Create Masks for Road and Sidewalk
-        road_mask = pygame.Surface((max_x, height), pygame.SRCALPHA)
-        road_mask.fill((0, 0, 0, 0))
-
-        sidewalk_mask = pygame.Surface((max_x, height), pygame.SRCALPHA)
-        sidewalk_mask.fill((0, 0, 0, 0))
-
-        # We don't need a banner mask anymore since we draw it explicitly
-        
-        # Draw the continuous road shape
-        # Draw circles at vertices for smooth joints
-        for i in range(0, len(self.track_points), 2):
-            pt = self.track_points[i]
-            draw_y = int(pt[1] + Y_PADDING)
-            if draw_y > -sidewalk_radius and draw_y < height + sidewalk_radius:
-                 pygame.draw.circle(sidewalk_mask, (255, 255, 255, 255), (int(pt[0]), draw_y), sidewalk_radius)
-                 pygame.draw.circle(road_mask, (255, 255, 255, 255), (int(pt[0]), draw_y), road_radius)
-            
-        # 3. Apply Mask to Texture
-        
-        # Apply masks
-        sidewalk_surf.blit(sidewalk_mask, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
-        road_surf.blit(road_mask, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
-        
-        # Combine: 
-        # Bottom: Banner Layer
-        # Middle: Sidewalk
-        # Top: Road
-        
-        final_surf = banner_layer
-        final_surf.blit(sidewalk_surf, (0, 0))
-        final_surf.blit(road_surf, (0, 0))
-        
-        return final_surf
-
-    def generate_track_points(self):
-        points = []
-        # Generate a sine wave track
-        length = 15000
-        for x in range(0, length, 50):
-            # Ease in the curves so the start is straight
-            # The start line is not tilted
-            curve_intensity = min(1.0, x / 1500.0)
-            
-            # Complex sine wave for interesting curves
-            y = self.screen_height // 2 + \
-                (math.sin(x * 0.002) * 200 + \
-                math.sin(x * 0.005) * 100) * curve_intensity
-            points.append((x, y))
-        return points
+    def build_decorations(self):
+        """Track decorations as (pre-rotated image, world centre) pairs."""
+        decorations = []
+        # Sizing similar to the track width
+        for texture, progress in ((self.start_texture, 0), (self.finish_texture, 1.0)):
+            x, y, angle = self.get_track_position(progress, 0, 0)
+            img = pygame.transform.scale(texture, (50, 360))
+            img = pygame.transform.rotate(img, angle)
+            decorations.append((img, (x, y)))
+        return decorations
 
     def get_track_position(self, progress, lane_idx, total_lanes):
-        # Map 0.0-1.0 to track length
-        total_dist = len(self.track_points) - 2 # Safety buffer
-        float_idx = progress * total_dist
-        idx = int(float_idx)
-        t = float_idx - idx
-        
-        # Get point and next point for tangent
-        p1 = self.track_points[idx]
-        p2 = self.track_points[idx + 1]
-        
-        # Interpolate
-        x = p1[0] + (p2[0] - p1[0]) * t
-        y = p1[1] + (p2[1] - p1[1]) * t
-        
-        # Tangent angle
-        dx = p2[0] - p1[0]
-        dy = p2[1] - p1[1]
-        angle = math.atan2(dy, dx)
-        
-        # Lane offset (perpendicular to path)
-        # 90 degrees is +PI/2
-        perp_angle = angle + math.pi / 2
-        
-        # Track width is dynamic
-        lane_width = self.drivable_width / max(1, total_lanes)
-        offset = (lane_idx - total_lanes/2) * lane_width
-        
-        final_x = x + math.cos(perp_angle) * offset
-        final_y = y + math.sin(perp_angle) * offset
-        
-        return final_x, final_y, -math.degrees(angle)
+        return self.track.get_position(progress, lane_idx, total_lanes)
 
     def load_settings(self):
         try:
@@ -460,67 +273,254 @@ class Game:
             }
 
     def load_contestants(self, filepath):
-        names = []
+        # Streamed, deduplicated by ID and optionally sampled (see roster.py).
+        # The sample comes from race_seed when set, so a fixed seed draws the
+        # same people, else from fresh entropy; either way the seed, sample
+        # settings and CSV hash go into every race log as roster_source
+        seed = self.settings.get("race_seed")
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        self.roster_source = None
+        self.drawn = [] # Winners taken off the list since the roster was sampled
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                next(reader, None) # Skip header
-                for row in reader:
-                    if row:
-                        names.append(row[0])
+            csv_hash = file_hash(filepath)
+            sample_size = int(self.settings.get("roster_sample_size", 0))
+            weighted = bool(self.settings.get("roster_weighted", False))
+            roster = load_roster(filepath, sample_size=sample_size, weighted=weighted,
+                                 seed=stream_seed(seed, ROSTER_STREAM),
+                                 cache_dir=self.settings.get("roster_cache_dir", ROSTER_CACHE_DIR),
+                                 csv_hash=csv_hash)
+            names = [c.name for c in roster]
+            self.roster_source = {"csv": filepath, "sha1": csv_hash, "sample_size": sample_size,
+                                  "weighted": weighted, "seed": int(seed)}
         except Exception as e:
             print(f"Error loading CSV: {e}")
             names = [f"Racer {i}" for i in range(1, 21)]
-            
-        random.shuffle(names)
-        return names[:60] 
+        return names
 
     def start_race(self):
+        # One seed drives the whole draw: race_seed from settings, or fresh
+        # entropy that ends up in the race log
+        seed = self.settings.get("race_seed")
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        self.race_seed = seed
+        self.loading_error = None
+        # The seed also deals the names into their slots (and heats)
+        entrants = deal(self.contestants, seed)
+
+        heat_size = int(self.settings.get("heat_size", 0))
+        if heat_size >= 2 and len(entrants) > heat_size:
+            # Fields bigger than heat_size race heats off screen first, on a
+            # worker thread while the window shows their progress; only the
+            # final is shown
+            self.state = "HEATS"
+            self.heat_result = None
+            self.set_loading("Racing heats", 0.0)
+            threading.Thread(target=self.race_heats, args=(entrants, seed), daemon=True).start()
+        else:
+            self.begin_race(entrants, [])
+
+    def race_heats(self, entrants, seed):
+        # Runs on the heats thread; update() starts the final once it's done
+        def report(round_number, fraction):
+            self.set_loading(f"Racing heats, round {round_number}", fraction)
+        try:
+            self.heat_result = run_heats(entrants, self.settings, seed=seed, report=report)
+        except Exception as e:
+            traceback.print_exc()
+            self.loading_error = f"Heats failed: {e}"
+
+    def begin_race(self, entrants, heats):
+        if heats:
+            print(f"{len(heats)} heat(s) raced, {len(entrants)} contestant(s) in the final")
         self.racers = []
-        self.obstacles = [] # Reset obstacles
-        self.boosters = [] # Reset boosters
         self.finished_racers = []
         self.winner = None
+        self.zoom_frame_key = None
         self.state = "COUNTDOWN"
         self.countdown_start = pygame.time.get_ticks()
         
-        if self.countdown_sound:
-            self.countdown_sound.play()
-        
-        dur_mult = float(self.settings.get("race_duration_multiplier", 1.0))
+        self.audio.play('countdown')
         
-        num_racers = len(self.contestants)
-        for i, name in enumerate(self.contestants):
-            hue = i / max(1, num_racers)
-            color = pygame.Color(0)
-            color.hsva = ((hue * 360) % 360, 100, 100, 100)
-            
-            r = Racer(name, i, num_racers, color, dur_mult)
-            rx, ry, rangle = self.get_track_position(0, i, num_racers)
-            r.x = rx
-            r.y = ry
-            r.angle = rangle
-            self.racers.append(r)
+        # The engine decides the race at a fixed timestep; we only render it
+        self.sim_accumulator = 0.0
+        self.race = RaceSimulation(entrants, self.settings, seed=self.race_seed, track=self.track,
+                                   obstacle_variants=len(self.obstacle_images),
+                                   booster_variants=len(self.booster_images))
+        self.recorder = self.start_recording(heats)
+        self.build_racers()
             
         sx, sy, _ = self.get_track_position(0, 0, 1)
         self.camera_offset = [sx - self.screen_width * 0.4, sy - self.screen_height * 0.5]
         self.zoom_level = 1.0
 
+    def build_racers(self):
+        # One sprite renderer per racer of self.race
+        self.racers = []
+        num_racers = self.race.num_racers
+        for i in range(num_racers):
+            hue = i / max(1, num_racers)
+            color = pygame.Color(0)
+            # Whole degrees so tinted sprites are reused across rounds
+            color.hsva = (round(hue * 360) % 360, 100, 100, 100)
+            
+            self.racers.append(Racer(self.race, i, color))
+
+        # Rotate the normal car sprites up front for every heading on the track
+        base_images = {id(r.base_image): r.base_image for r in self.racers}
+        warm_rotations(base_images.values(), self.track.heading_buckets())
+
+    def start_recording(self, heats):
+        # Stream the race to race_log_dir (see race_log.py); "" turns it off
+        log_dir = self.settings.get("race_log_dir", RACE_LOG_DIR)
+        if not log_dir:
+            return None
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            name = f"race_{time.strftime('%Y%m%d_%H%M%S')}_{self.race.seed & 0xffffffff:08x}.rlog"
+            roster_source = dict(self.roster_source, drawn=list(self.drawn)) if self.roster_source else None
+            return RaceRecorder(os.path.join(log_dir, name), self.race, pool=self.contestants, heats=heats,
+                                roster_source=roster_source)
+        except Exception as e:
+            print(f"Failed to start race log: {e}")
+            return None
+
     def reset_to_menu(self):
         if self.winner and self.winner.name in self.contestants:
             self.contestants.remove(self.winner.name)
+            self.drawn.append(self.winner.name)
+            # Drawn names leave the list and every row below them is renumbered
+            self.contestant_list.set_names(self.contestants)
         self.state = "START_MENU"
         self.zoom_level = 1.0
+        self.zoom_frame_key = None
         self.winner = None
         self.racers = []
+        self.race = None
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+        self.finished_racers = []
+
+    def latest_race_log(self):
+        log_dir = self.settings.get("race_log_dir", RACE_LOG_DIR)
+        if not log_dir or not os.path.isdir(log_dir):
+            return None
+        logs = [os.path.join(log_dir, f) for f in os.listdir(log_dir) if f.endswith('.rlog')]
+        return max(logs, key=os.path.getmtime, default=None)
+
+    def start_replay(self, path):
+        """Play a race log back (see race_log.RaceReplay); Escape returns to
+        the screen it was opened from."""
+        try:
+            log = RaceLog(path)
+        except Exception as e:
+            print(f"Failed to open race log {path}: {e}")
+            return
+        # Items carry sprite variant indices from when the race was recorded
+        for kind, images in (("obstacle", self.obstacle_images), ("booster", self.booster_images)):
+            recorded = log.header[f"{kind}_variants"]
+            if recorded and not images:
+                print(f"Can't replay {path}: it has {kind}s but no {kind} images are loaded")
+                return
+            if recorded != len(images):
+                print(f"{path} was recorded with {recorded} {kind} image(s), {len(images)} loaded now; "
+                      f"{kind}s will look different")
+        self.replay_return = {
+            "state": self.state, "race": self.race, "racers": self.racers, "winner": self.winner,
+            "finished_racers": self.finished_racers, "camera_offset": list(self.camera_offset),
+            "zoom_level": self.zoom_level, "track": (self.track, self.decorations, self.track_texture),
+        }
+        num_lanes = log.header["track_contestants"]
+        if num_lanes != self.track.num_contestants:
+            # Recorded on a track of another width
+            self.build_track(num_lanes)
+
+        self.race = RaceReplay(log, self.track)
+        self.build_racers()
         self.finished_racers = []
-        self.scroll_y = 0
+        self.winner = None
+        self.state = "REPLAY"
+        self.zoom_frame_key = None
+        self.replay_speed = 1
+        self.replay_paused = False
+        self.scrubbing = False
+        self.seek_replay(0)
+
+    def seek_replay(self, tick):
+        self.race.seek(tick)
+        self.replay_clock = float(max(0, min(tick, self.race.end_tick)))
+        # Cut straight to the new moment instead of panning across the track
+        leader = self.racers[self.race.leader]
+        self.camera_offset = [leader.x - self.screen_width * 0.4, leader.y - self.screen_height * 0.5]
+        self.zoom_level = 1.0
+        self.winner = None
+
+    def scrub_replay(self, mx):
+        fraction = (mx - self.replay_bar.x) / self.replay_bar.width
+        self.seek_replay(round(max(0.0, min(1.0, fraction)) * self.race.end_tick))
+
+    def end_replay(self):
+        saved = self.replay_return
+        self.replay_return = None
+        self.state = saved["state"]
+        self.race = saved["race"]
+        self.racers = saved["racers"]
+        self.winner = saved["winner"]
+        self.finished_racers = saved["finished_racers"]
+        self.camera_offset = saved["camera_offset"]
+        self.zoom_level = saved["zoom_level"]
+        self.zoom_frame_key = None
+        if saved["track"][0] is not self.track:
+            # The replay's own track is done with; stop its builder thread
+            self.track_texture.close()
+            self.track, self.decorations, self.track_texture = saved["track"]
+            self.track_width = self.track.track_width
+            self.drivable_width = self.track.drivable_width
+            self.track_points = self.track.points
+
+    def handle_replay_input(self, event):
+        # Space pauses, Left/Right skip, Up/Down change speed, Home/End jump,
+        # F jumps to just before the winning finish, the bar can be clicked
+        # or dragged, Escape/R closes the replay
+        if event.type == pygame.KEYDOWN:
+            speed = REPLAY_SPEEDS.index(self.replay_speed)
+            if event.key == pygame.K_SPACE:
+                self.replay_paused = not self.replay_paused
+            elif event.key == pygame.K_LEFT:
+                self.seek_replay(self.race.tick - REPLAY_SKIP_TICKS)
+            elif event.key == pygame.K_RIGHT:
+                self.seek_replay(self.race.tick + REPLAY_SKIP_TICKS)
+            elif event.key == pygame.K_UP:
+                self.replay_speed = REPLAY_SPEEDS[min(speed + 1, len(REPLAY_SPEEDS) - 1)]
+            elif event.key == pygame.K_DOWN:
+                self.replay_speed = REPLAY_SPEEDS[max(speed - 1, 0)]
+            elif event.key == pygame.K_HOME:
+                self.seek_replay(0)
+            elif event.key == pygame.K_END:
+                self.seek_replay(self.race.end_tick)
+            elif event.key == pygame.K_f and self.race.winner_tick is not None:
+                self.seek_replay(self.race.winner_tick - REPLAY_LEAD_IN_TICKS)
+            elif event.key in (pygame.K_ESCAPE, pygame.K_r):
+                self.end_replay()
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            if self.replay_bar.inflate(0, 20).collidepoint(event.pos):
+                self.scrubbing = True
+                self.scrub_replay(event.pos[0])
+        elif event.type == pygame.MOUSEMOTION and self.scrubbing:
+            self.scrub_replay(event.pos[0])
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            self.scrubbing = False
 
     def handle_input(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+
+            if self.state in ("LOADING", "HEATS"):
+                continue # Only quitting works until the menu or the final is up
             
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mx, my = pygame.mouse.get_pos()
@@ -533,188 +533,180 @@ class Game:
                 if self.state == "START_MENU":
                     # Simple Start Button Region
                     # mx, my = pygame.mouse.get_pos() # Already got above
-                    if self.start_btn_rect.collidepoint(mx, my):
+                    if self.track_ready and self.start_btn_rect.collidepoint(mx, my):
                          self.start_race()
 
                 if self.state == "FINISHED":
                      if self.restart_btn_rect.collidepoint(mx, my):
                          self.reset_to_menu()
 
-            if event.type == pygame.MOUSEWHEEL:
-                if self.state == "START_MENU":
-                    mx, my = pygame.mouse.get_pos()
-                    panel_rect = pygame.Rect(50, 200, 300, self.screen_height - 250)
-                    if panel_rect.collidepoint(mx, my):
-                         self.scroll_y -= event.y * 20
-                         total_height = len(self.contestants) * 20
-                         visible_height = panel_rect.height - 50
-                         max_scroll = max(0, total_height - visible_height)
-                         self.scroll_y = max(0, min(self.scroll_y, max_scroll))
+            if self.state == "START_MENU":
+                # Scrolling and search typing
+                self.contestant_list.handle_event(event)
+
+            if self.state == "REPLAY":
+                self.handle_replay_input(event)
+                continue
 
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r and self.state == "FINISHED":
                     self.reset_to_menu()
-
-    def update(self):
-        if self.state == "COUNTDOWN":
+                elif event.key == pygame.K_p and self.state == "FINISHED" and self.recorder:
+                    self.start_replay(self.recorder.path)
+                elif event.key == pygame.K_F2 and self.state == "START_MENU" and self.track_ready:
+                    path = self.latest_race_log()
+                    if path:
+                        self.start_replay(path)
+
+    def update(self, dt=TICK_MS):
+        # dt: real milliseconds since the previous frame
+        if self.pending_replay and self.track_ready:
+            path, self.pending_replay = self.pending_replay, None
+            self.start_replay(path)
+
+        if self.state == "HEATS":
+            if self.loading_error:
+                self.state = "START_MENU" # The menu shows what went wrong
+            elif self.heat_result:
+                self.begin_race(*self.heat_result)
+
+        elif self.state == "COUNTDOWN":
             now = pygame.time.get_ticks()
             if now - self.countdown_start > 3000:
                 self.state = "RACING"
-                if self.start_sound:
-                    self.start_sound.play()
-                
-                if self.bg_music_path:
-                    try:
-                        pygame.mixer.music.load(self.bg_music_path)
-                        pygame.mixer.music.set_volume(0.3)
-                        pygame.mixer.music.play(-1)
-                    except Exception as e:
-                        print(f"Failed to play background music: {e}")
+                self.audio.play('start')
+                self.audio.play_music()
         
         elif self.state == "RACING":
-            all_finished = True
-            
             if not self.racers: return
 
-            # Sort by progress to determine rank
-            sorted_racers = sorted(self.racers, key=lambda r: r.course_progress, reverse=True)
-            leader_prog = sorted_racers[0].course_progress
-            
-            for i, racer in enumerate(self.racers):
-                # We need the racer's rank. Racer is 'racer', find its index in sorted_racers
-                rank = sorted_racers.index(racer)
-                
-                if not racer.finished:
-                    racer.update_logic(rank, len(self.racers), leader_prog, self.settings)
-                    
-                    # Handle Obstacle Generation requested by racer
-                    if getattr(racer, 'wants_obstacle', False) and self.obstacle_images:
-                        racer.wants_obstacle = False
-                        
-                        # Get distance from settings (default 1000 virtual pixels)
-                        gen_dist = self.settings.get("obstacle_generate_distance", 1000)
-                        
-                        # Track is approx 15000 units long (from generate_track_points)
-                        # Convert pixel distance to progress (0.0 - 1.0)
-                        dist_inc = gen_dist / 15000.0
-                        
-                        # Add slight variance to prevent obvious patterns if multiple spawn?
-                        # dist_inc *= random.uniform(0.9, 1.1)
-
-                        obs_prog = min(0.99, racer.course_progress + dist_inc)
-                        
-                        ox, oy, _ = self.get_track_position(obs_prog, racer.lane_index, racer.total_lanes)
-                        img = random.choice(self.obstacle_images)
-                        
-                        self.obstacles.append({
-                            'progress': obs_prog,
-                            'lane': racer.lane_index,
-                            'image': img,
-                            'x': ox,
-                            'y': oy
-                        })
-
-                    # Handle Booster Generation
-                    if getattr(racer, 'wants_boost', False) and self.booster_images:
-                        racer.wants_boost = False
-                        
-                        gen_dist = self.settings.get("booster_generate_distance", 1000)
-                        dist_inc = gen_dist / 15000.0
-                        boost_prog = min(0.99, racer.course_progress + dist_inc)
-                        
-                        bx, by, _ = self.get_track_position(boost_prog, racer.lane_index, racer.total_lanes)
-                        img = random.choice(self.booster_images)
-                        
-                        self.boosters.append({
-                            'progress': boost_prog,
-                            'lane': racer.lane_index,
-                            'image': img,
-                            'x': bx,
-                            'y': by
-                        })
-
-                    if racer.finished:
+            # Run as many fixed ticks as real time has passed, so a slow frame
+            # doesn't stretch the race or change its outcome
+            self.sim_accumulator += min(dt, MAX_FRAME_MS)
+            while self.sim_accumulator >= TICK_MS and not self.race.is_finished:
+                self.sim_accumulator -= TICK_MS
+                events = self.race.step()
+                if self.recorder:
+                    try:
+                        self.recorder.record(self.race)
+                    except Exception as e:
+                        print(f"Failed to write race log: {e}")
+                        self.recorder = None
+                for event in events:
+                    racer = self.racers[event.racer]
+                    if event.kind == 'crash':
+                        self.audio.play('crash')
+                    elif event.kind == 'boost':
+                        self.audio.play('boost')
+                    elif event.kind == 'finish':
                         racer.finish_time = pygame.time.get_ticks()
                         self.finished_racers.append(racer)
-                        all_finished = False 
-                    else:
-                        all_finished = False
-                
-                # Update position for rendering
-                rx, ry, rangle = self.get_track_position(racer.course_progress, racer.lane_index, racer.total_lanes)
-                racer.x, racer.y, racer.angle = rx, ry, rangle + getattr(racer, 'visual_angle_offset', 0)
-
-                # Check Obstacle Collisions
-                if not racer.finished and racer.state != "CRASHED":
-                     # Simple distance check based on object size
-                     hitbox_size = self.settings.get("obstacle_size", 40) * 0.7 # slightly forgiving
-                     
-                     for obs in self.obstacles[:]:
-                         dx = racer.x - obs['x']
-                         dy = racer.y - obs['y']
-                         if abs(dx) < hitbox_size and abs(dy) < hitbox_size: # Hitbox
-                             if hasattr(racer, 'crash'):
-                                 racer.crash()
-                                 if self.crash_sound: self.crash_sound.play()
-                             # Remove obstacle so others don't hit the same one immediately (or leave it?)
-                             # Getting rid of it avoids multiple crashes on same frame or confusing clutter
-                             self.obstacles.remove(obs)
-                             break
-                
-                # Check Booster Collisions
-                if not racer.finished and racer.state != "CRASHED":
-                     hitbox_size = self.settings.get("booster_size", 40) * 0.8
-                     
-                     for boost in self.boosters[:]:
-                         dx = racer.x - boost['x']
-                         dy = racer.y - boost['y']
-                         if abs(dx) < hitbox_size and abs(dy) < hitbox_size:
-                             if hasattr(racer, 'boost'):
-                                 racer.boost()
-                                 if self.boost_sound: self.boost_sound.play()
-                             self.boosters.remove(boost)
-                             break
-            
-            if self.racers:
-                leader = sorted_racers[0]
-                target_cam_x = leader.x - self.screen_width * 0.4
-                target_cam_y = leader.y - self.screen_height * 0.5
-                
-                self.camera_offset[0] += (target_cam_x - self.camera_offset[0]) * 0.1
-                self.camera_offset[1] += (target_cam_y - self.camera_offset[1]) * 0.1
+            # Draw cars part way between the last two ticks
+            self.race.interpolate(self.sim_accumulator / TICK_MS)
+            self.follow_leader(dt)
 
-            if len(self.finished_racers) == len(self.racers):
+            if self.race.is_finished:
                 self.state = "FINISHED"
                 self.winner = self.finished_racers[0]
-                if self.finish_sound:
-                    self.finish_sound.play()
-                pygame.mixer.music.stop()
+                self.audio.play('finish')
+                self.audio.stop_music()
         
         elif self.state == "FINISHED":
-            # Smoothly Center on Winner and Zoom
-            if self.winner:
-                # With zoom, we need to center carefully.
-                # If zoom is 2.0, the "screen" is half size.
-                current_w = self.screen_width / self.zoom_level
-                current_h = self.screen_height / self.zoom_level
-                
-                target_cam_x = self.winner.x - current_w * 0.5
-                target_cam_y = self.winner.y - current_h * 0.5
-                
-                self.camera_offset[0] += (target_cam_x - self.camera_offset[0]) * 0.05
-                self.camera_offset[1] += (target_cam_y - self.camera_offset[1]) * 0.05
+            self.follow_winner(dt)
+
+        elif self.state == "REPLAY":
+            if not self.replay_paused and not self.scrubbing:
+                self.replay_clock += min(dt, MAX_FRAME_MS) / TICK_MS * self.replay_speed
+                self.replay_clock = min(self.replay_clock, float(self.race.end_tick))
+            target = int(self.replay_clock)
+            if target < self.race.tick or target - self.race.tick >= KEYFRAME_TICKS:
+                self.race.seek(target)
+            while self.race.tick < target:
+                for event in self.race.step():
+                    # Effects only at speeds where they still make sense
+                    if self.replay_speed <= 2 and event.kind in ('crash', 'boost'):
+                        self.audio.play(event.kind)
+            self.race.interpolate(self.replay_clock - self.race.tick)
+
+            if self.race.is_finished:
+                if self.winner is None:
+                    self.winner = self.racers[self.race.finished_racers[0]]
+                    self.audio.play('finish')
+                self.follow_winner(dt)
+            else:
+                self.follow_leader(dt)
 
-                # Zoom logic
-                target_zoom = self.settings.get("winning_car_zoom", 1.5)
-                self.zoom_level += (target_zoom - self.zoom_level) * 0.04
+    def follow_leader(self, dt):
+        leader = self.racers[self.race.leader]
+        target_cam_x = leader.x - self.screen_width * 0.4
+        target_cam_y = leader.y - self.screen_height * 0.5
+        
+        follow = self.frame_smoothing(0.1, dt)
+        self.camera_offset[0] += (target_cam_x - self.camera_offset[0]) * follow
+        self.camera_offset[1] += (target_cam_y - self.camera_offset[1]) * follow
+
+    def follow_winner(self, dt):
+        # Smoothly Center on Winner and Zoom
+        if self.winner:
+            # Snapping skips the easing: camera and zoom jump to the final view,
+            # so after one render draw() keeps reusing the cached scaled frame
+            target_zoom = self.settings.get("winning_car_zoom", 1.5)
+            snap = self.settings.get("winning_car_zoom_snap", False)
+            if snap:
+                self.zoom_level = target_zoom
+
+            # With zoom, we need to center carefully.
+            # If zoom is 2.0, the "screen" is half size.
+            current_w = self.screen_width / self.zoom_level
+            current_h = self.screen_height / self.zoom_level
+            
+            target_cam_x = self.winner.x - current_w * 0.5
+            target_cam_y = self.winner.y - current_h * 0.5
+            
+            follow = 1.0 if snap else self.frame_smoothing(0.05, dt)
+            self.camera_offset[0] += (target_cam_x - self.camera_offset[0]) * follow
+            self.camera_offset[1] += (target_cam_y - self.camera_offset[1]) * follow
+
+            # Zoom logic
+            if not snap:
+                self.zoom_level += (target_zoom - self.zoom_level) * self.frame_smoothing(0.04, dt)
+
+    @staticmethod
+    def frame_smoothing(rate, dt):
+        # Per-tick easing factor scaled to a frame of dt ms
+        return 1 - (1 - rate) ** (min(dt, MAX_FRAME_MS) / TICK_MS)
         
     def draw_track(self, surface, cam_x, cam_y):
-        # Track surface generated with extra Y_PADDING of 800
-        dest_x = 0 - cam_x
-        dest_y = -800 - cam_y
-        surface.blit(self.track_surface, (dest_x, dest_y))
+        # Only the tiles intersecting the viewport are blitted
+        self.track_texture.draw(surface, cam_x, cam_y)
+
+    def draw_loading(self):
+        # Startup progress, drawn before any asset has been loaded
+        self.screen.fill(BLACK)
+        cx, cy = self.screen_width // 2, self.screen_height // 2
+        title = render_text(self.large_font, "GRAND PRIX LOTTERY", GOLD)
+        self.screen.blit(title, title.get_rect(center=(cx, cy - 100)))
+
+        bar = pygame.Rect(0, 0, 600, 24)
+        bar.center = (cx, cy)
+        pygame.draw.rect(self.screen, GRAY, bar, border_radius=5)
+        filled = bar.copy()
+        filled.width = int(bar.width * self.loading_progress)
+        if filled.width:
+            pygame.draw.rect(self.screen, GREEN, filled, border_radius=5)
+
+        if self.loading_error:
+            label = render_text(self.ui_font, self.loading_error, RED)
+        else:
+            label = render_text(self.ui_font, f"{self.loading_stage}...", WHITE)
+        self.screen.blit(label, label.get_rect(midtop=(cx, bar.bottom + 15)))
+        pygame.display.flip()
 
     def draw(self):
+        if self.state in ("LOADING", "HEATS"):
+            self.draw_loading()
+            return
+
         # We handle zooming by rendering to a temporary surface if needed
         # Or more efficiently, we only use a temp surface if zoom != 1.0 (with some epsilon)
         
@@ -728,22 +720,33 @@ class Game:
         if should_scale:
             render_width = int(self.screen_width / self.zoom_level)
             render_height = int(self.screen_height / self.zoom_level)
-            # Create temp surface (optimize by reusing?)
-            # For now create new to stay simple
-            target_surf = pygame.Surface((render_width, render_height))
+            # The world is drawn into a view of one pooled surface, no per-frame
+            # allocation. Zooming in fits a screen-sized one; zooming out
+            # (winning_car_zoom < 1) needs room for the widest view the zoom
+            # eases towards
+            min_zoom = min(1.0, self.zoom_level, self.settings.get("winning_car_zoom", 1.5))
+            world_size = (int(self.screen_width / min_zoom), int(self.screen_height / min_zoom))
+            world_surf = self.get_render_target('world', world_size)
+            target_surf = world_surf.subsurface((0, 0, render_width, render_height))
+
+            # Once the race is over the world is static, so while the camera
+            # and zoom hold still the last scaled frame can be shown again
+            frame_key = (render_width, render_height,
+                         round(self.camera_offset[0] * 2), round(self.camera_offset[1] * 2))
+            if self.state == "FINISHED" and frame_key == self.zoom_frame_key:
+                self.screen.blit(self.get_render_target('zoom_frame', (self.screen_width, self.screen_height), world_surf), (0, 0))
+                self.draw_overlay()
+                pygame.display.flip()
+                return
+            self.zoom_frame_key = frame_key if self.state == "FINISHED" else None
         
         # Draw Tiled Background
-        # Calculate offset modulo texture size to create infinite tiling effect
+        # One blit of a pre-tiled plane, shifted by the camera offset modulo
+        # the texture size to create infinite tiling effect
         bg_w, bg_h = self.background_texture.get_size()
-        
-        # Determine starting position for tiling
         start_x = -(self.camera_offset[0] % bg_w)
         start_y = -(self.camera_offset[1] % bg_h)
-        
-        # Tile across render surface
-        for x in range(int(start_x), render_width, bg_w):
-            for y in range(int(start_y), render_height, bg_h):
-                target_surf.blit(self.background_texture, (x, y))
+        target_surf.blit(self.get_background_plane(render_width, render_height), (int(start_x), int(start_y)))
         
         if self.state == "START_MENU":
             # Draw Start Screen
@@ -754,152 +757,167 @@ class Game:
                  render_width = self.screen_width
                  render_height = self.screen_height
 
-            overlay = pygame.Surface((self.screen_width, self.screen_height), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 150))
+            overlay = self.get_render_target('menu_overlay', (self.screen_width, self.screen_height),
+                                             fill=(0, 0, 0, 150))
             self.screen.blit(overlay, (0,0))
             
             # Title
-            title = self.large_font.render("GRAND PRIX LOTTERY", True, GOLD)
+            title = render_text(self.large_font, "GRAND PRIX LOTTERY", GOLD)
             title_rect = title.get_rect(center=(self.screen_width//2, 100))
             self.screen.blit(title, title_rect)
             
-            # Start Button
-            self.screen.blit(self.start_btn_img, self.start_btn_rect)
+            # Start Button, dimmed until the track has finished building
+            if self.track_ready:
+                self.screen.blit(self.start_btn_img, self.start_btn_rect)
+            else:
+                self.screen.blit(self.start_btn_dim, self.start_btn_rect)
+            # A failed load would otherwise leave the last stage frozen under the button
+            label = None
+            if self.loading_error:
+                label = render_text(self.ui_font, self.loading_error, RED)
+            elif not self.track_ready:
+                label = render_text(self.ui_font, f"{self.loading_stage}... {int(self.loading_progress * 100)}%", WHITE)
+            if label:
+                self.screen.blit(label, label.get_rect(midtop=(self.start_btn_rect.centerx, self.start_btn_rect.bottom + 10)))
             
             # Sidebar List
-            # Left panel
-            panel_height = self.screen_height - 250
-            panel_rect = pygame.Rect(50, 200, 300, panel_height)
-            pygame.draw.rect(self.screen, (30, 30, 30), panel_rect, border_radius=5)
-            
-            header = self.ui_font.render("Contestants", True, WHITE)
-            self.screen.blit(header, (60, 210))
-            
-            # Clip for scrolling area
-            list_start_y = 250
-            # Ensure clip rect is within screen bounds
-            list_rect = pygame.Rect(50, list_start_y, 300, max(0, panel_height - 50))
-            
-            # Save current clip
-            original_clip = self.screen.get_clip()
-            self.screen.set_clip(list_rect)
-            
-            draw_start_y = list_start_y - self.scroll_y
-            
-            for i, name in enumerate(self.contestants):
-                y_pos = draw_start_y + i * 20
-                # Optimization: only draw if touching visible area
-                if y_pos + 20 < list_start_y: continue
-                if y_pos > 200 + panel_height: break # Below view
-                
-                txt = self.font.render(f"{i+1}. {name}", True, (200, 200, 200))
-                self.screen.blit(txt, (60, y_pos))
-            
-            # Restore clip
-            self.screen.set_clip(original_clip)
+            self.contestant_list.draw(self.screen)
                 
-        elif self.state in ["RACING", "FINISHED", "COUNTDOWN"]:
+        elif self.state in ["RACING", "FINISHED", "COUNTDOWN", "REPLAY"]:
             # Virtual Camera Rendering
             
             # 1. Draw Track
             self.draw_track(target_surf, self.camera_offset[0], self.camera_offset[1])
             
-            # 2. Draw Start/Finish Lines
-            # Start
-            start_x, start_y, start_angle = self.get_track_position(0, 0, 0)
-            s_screen_x = start_x - self.camera_offset[0]
-            s_screen_y = start_y - self.camera_offset[1]
-            
-            if -100 < s_screen_x < render_width + 100 and -100 < s_screen_y < render_height + 100:
-                # Scale start line to track width
-                # Track width is 340, start line texture might be different
-                start_img = pygame.transform.scale(self.start_texture, (50, 360)) # Sizing similar to finish line
-                start_img = pygame.transform.rotate(start_img, start_angle)
-                start_rect = start_img.get_rect(center=(s_screen_x, s_screen_y))
-                target_surf.blit(start_img, start_rect)
-
-            # Finish
-            end_x, end_y, end_angle = self.get_track_position(1.0, 0, 0)
-            e_screen_x = end_x - self.camera_offset[0]
-            e_screen_y = end_y - self.camera_offset[1]
+            # 2. Draw Start/Finish Lines (pre-rotated in build_decorations)
+            for img, (dx, dy) in self.decorations:
+                d_screen_x = dx - self.camera_offset[0]
+                d_screen_y = dy - self.camera_offset[1]
+                if -100 < d_screen_x < render_width + 100 and -100 < d_screen_y < render_height + 100:
+                    target_surf.blit(img, img.get_rect(center=(d_screen_x, d_screen_y)))
             
-            if -100 < e_screen_x < render_width + 100 and -100 < e_screen_y < render_height + 100:
-                # Scale finish line
-                finish_img = pygame.transform.scale(self.finish_texture, (50, 360))
-                finish_img = pygame.transform.rotate(finish_img, end_angle)
-                finish_rect = finish_img.get_rect(center=(e_screen_x, e_screen_y))
-                target_surf.blit(finish_img, finish_rect)
-            
-            # Draw Obstacles (Before racers)
-            if self.obstacles:
-                 for obs in self.obstacles:
-                     ox_screen = obs['x'] - self.camera_offset[0]
-                     oy_screen = obs['y'] - self.camera_offset[1]
-                     if -50 < ox_screen < render_width + 50 and -50 < oy_screen < render_height + 50:
-                         img = obs['image']
-                         rect = img.get_rect(center=(ox_screen, oy_screen))
-                         target_surf.blit(img, rect)
-
-            # Draw Boosters
-            if self.boosters:
-                 for boost in self.boosters:
-                     bx_screen = boost['x'] - self.camera_offset[0]
-                     by_screen = boost['y'] - self.camera_offset[1]
-                     if -50 < bx_screen < render_width + 50 and -50 < by_screen < render_height + 50:
-                         img = boost['image']
-                         rect = img.get_rect(center=(bx_screen, by_screen))
-                         target_surf.blit(img, rect)
+            # Draw Obstacles and Boosters (Before racers)
+            self.draw_items(target_surf, self.race.obstacles, self.obstacle_images, render_width, render_height)
+            self.draw_items(target_surf, self.race.boosters, self.booster_images, render_width, render_height)
 
             # Draw Racers
-            # Draw from top to bottom (y-sorting) for psuedo-depth doesn't matter much top-down
-            # But order matters if overlapping
-            for racer in self.racers:
-                screen_x = racer.x - self.camera_offset[0]
-                screen_y = racer.y - self.camera_offset[1]
+            # Dense packs draw far-off cars as markers, underneath the full sprites
+            detailed, markers, tagged = self.racer_lod(self.visible_racers(render_width, render_height),
+                                                       render_width, render_height)
+            cam_x, cam_y = self.camera_offset
+            if len(markers):
+                xs = (self.race.draw_x[markers] - cam_x - MARKER_RADIUS).astype(int).tolist()
+                ys = (self.race.draw_y[markers] - cam_y - MARKER_RADIUS).astype(int).tolist()
+                blit_batch(target_surf, [(self.racers[i].marker, pos) for i, pos in zip(markers.tolist(), zip(xs, ys))])
+
+            # Index order, so overlapping cars stack the same way every frame
+            for i in detailed.tolist():
+                racer = self.racers[i]
+                screen_x = racer.x - cam_x
+                screen_y = racer.y - cam_y
                 
-                if -50 < screen_x < render_width + 50 and -50 < screen_y < render_height + 50:
-                    # Rotate the image
-                    # Note: Convert angle to degrees. racer.angle seems to be in degrees already based on get_track_position
-                    # but Pygame rotates CCW, so we might need to negate if it's not already correct.
-                    # get_track_position returns -math.degrees(angle), which is suitable for pygame if angle was math angle.
-                    
-                    rotated_img = pygame.transform.rotate(racer.current_image, racer.angle)
-                    rect = rotated_img.get_rect(center=(screen_x, screen_y))
-                    target_surf.blit(rotated_img, rect)
-                    
-                    # Name Tag
-                    tag = self.font.render(racer.name, True, WHITE)
-                    target_surf.blit(tag, (screen_x + 20, screen_y - 20))
-
-            # Apply Zoom if needed
-            if should_scale:
-                scaled_surf = pygame.transform.scale(target_surf, (self.screen_width, self.screen_height))
-                self.screen.blit(scaled_surf, (0, 0))
+                # Rotate the image
+                # Note: Convert angle to degrees. racer.angle seems to be in degrees already based on get_track_position
+                # but Pygame rotates CCW, so we might need to negate if it's not already correct.
+                # get_track_position returns -math.degrees(angle), which is suitable for pygame if angle was math angle.
+                
+                rotated_img = get_rotated(racer.current_image, racer.angle)
+                rect = rotated_img.get_rect(center=(screen_x, screen_y))
+                target_surf.blit(rotated_img, rect)
                 
+            # Name Tags
+            for i in tagged.tolist():
+                racer = self.racers[i]
+                tag = render_text(self.font, racer.name, WHITE)
+                target_surf.blit(tag, (racer.x - cam_x + 20, racer.y - cam_y - 20))
+
+            # Apply Zoom if needed, scaling into a pooled frame
+            if should_scale:
+                zoom_frame = self.get_render_target('zoom_frame', (self.screen_width, self.screen_height), world_surf)
+                pygame.transform.scale(target_surf, (self.screen_width, self.screen_height), zoom_frame)
+                self.screen.blit(zoom_frame, (0, 0))
+
+        self.draw_overlay()
+        pygame.display.flip()
+
+    def draw_items(self, surface, index, images, view_w, view_h, margin=50):
+        # Cull the obstacles/boosters against the view in one go, then blit in a batch
+        if not index:
+            return
+        _, xs, ys, items = index.arrays()
+        sx = xs - self.camera_offset[0]
+        sy = ys - self.camera_offset[1]
+        on_screen = np.flatnonzero((sx > -margin) & (sx < view_w + margin) &
+                                   (sy > -margin) & (sy < view_h + margin))
+        batch = []
+        for j in on_screen.tolist():
+            img = images[items[j]['variant'] % len(images)] # Replays may have fewer images than the log
+            batch.append((img, img.get_rect(center=(sx[j], sy[j]))))
+        blit_batch(surface, batch)
+
+    def visible_racers(self, view_w, view_h, margin=50):
+        """Indices of racers on screen, capped at max_drawn_racers.
+
+        When more than that are in view, the best-ranked ones are kept so
+        the cost of a frame stays bounded however big the field is.
+        """
+        sx = self.race.draw_x - self.camera_offset[0]
+        sy = self.race.draw_y - self.camera_offset[1]
+        on_screen = np.flatnonzero((sx > -margin) & (sx < view_w + margin) &
+                                   (sy > -margin) & (sy < view_h + margin))
+        limit = int(self.settings.get("max_drawn_racers", 1000))
+        if len(on_screen) > limit:
+            best = np.argsort(self.race.rank[on_screen], kind='stable')[:limit]
+            on_screen = np.sort(on_screen[best]) # Keep the usual draw order
+        return on_screen
+
+    def racer_lod(self, visible, view_w, view_h):
+        """Split on-screen racers into (full sprites, markers, name tags).
+
+        Up to lod_threshold cars are drawn in full. Past that, only the ones
+        nearest the middle of the view keep their sprite and the rest become
+        markers, and name tags go to the top lod_name_tags ranks plus the
+        lod_name_tags cars nearest the middle.
+        """
+        threshold = int(self.settings.get("lod_threshold", 80))
+        if len(visible) <= threshold:
+            return visible, visible[:0], visible
+
+        dx = self.race.draw_x[visible] - self.camera_offset[0] - view_w / 2
+        dy = self.race.draw_y[visible] - self.camera_offset[1] - view_h / 2
+        nearest = np.argsort(dx * dx + dy * dy, kind='stable')
+        detailed = np.sort(visible[nearest[:threshold]])
+        markers = np.sort(visible[nearest[threshold:]])
+
+        num_tags = int(self.settings.get("lod_name_tags", 10))
+        tag = self.race.rank[visible] < num_tags
+        tag[nearest[:num_tags]] = True
+        return detailed, markers, visible[tag]
+
+    def draw_overlay(self):
+        if self.state in ["RACING", "FINISHED", "COUNTDOWN", "REPLAY"]:
             # 3. UI Overlay - ALWAYS draw on direct screen
             # Leaderboard
             board_rect = pygame.Rect(20, 20, 250, 200)
-            s = pygame.Surface((250, 200), pygame.SRCALPHA)
-            s.fill((0, 0, 0, 180))
+            s = self.get_render_target('leaderboard', (250, 200), fill=(0, 0, 0, 180))
             self.screen.blit(s, board_rect)
             
-            head = self.ui_font.render("Leaderboard", True, GOLD)
+            head = render_text(self.ui_font, "Leaderboard", GOLD)
             self.screen.blit(head, (30, 25))
             
-            # Combine finished racers (in order of finish) with active racers (sorted by progress)
-            active_racers = [r for r in self.racers if not r.finished]
-            active_racers.sort(key=lambda r: r.course_progress, reverse=True)
-            live_rank = self.finished_racers + active_racers
+            # Finished racers (in order of finish) then active racers by progress,
+            # read from the ranking the race engine keeps per tick
+            live_rank = [self.racers[i] for i in self.race.standings(8)]
             
-            for i, racer in enumerate(live_rank[:8]):
-                txt = self.font.render(f"{i+1}. {racer.name}", True, WHITE if i > 0 else GOLD)
+            for i, racer in enumerate(live_rank):
+                txt = render_text(self.font, f"{i+1}. {racer.name}", WHITE if i > 0 else GOLD)
                 self.screen.blit(txt, (30, 55 + i * 20))
 
-            if self.state == "FINISHED" and self.winner:
+            if self.state in ["FINISHED", "REPLAY"] and self.winner:
                  # Victory Text
-                 text = self.winner_font.render(f"WINNER: {self.winner.name}", True, RED)
+                 text = render_text(self.winner_font, f"WINNER: {self.winner.name}", RED)
                  # Shadow
-                 text_shad = self.winner_font.render(f"WINNER: {self.winner.name}", True, BLACK)
+                 text_shad = render_text(self.winner_font, f"WINNER: {self.winner.name}", BLACK)
                  
                  cx, cy = self.screen_width//2, 100
                  r = text.get_rect(center=(cx, cy))
@@ -908,12 +926,17 @@ class Game:
                  self.screen.blit(text_shad, rs)
                  self.screen.blit(text, r)
                  
-                 sub = self.ui_font.render("Press 'R' for Menu", True, WHITE)
-                 self.screen.blit(sub, sub.get_rect(center=(cx, cy + 100)))
+            if self.state == "FINISHED" and self.winner:
+                 hint = "Press 'R' for Menu, 'P' for Replay" if self.recorder else "Press 'R' for Menu"
+                 sub = render_text(self.ui_font, hint, WHITE)
+                 self.screen.blit(sub, sub.get_rect(center=(self.screen_width//2, 200)))
 
                  # Restart Button
                  self.screen.blit(self.restart_btn_img, self.restart_btn_rect)
 
+        if self.state == "REPLAY":
+            self.draw_replay_bar()
+
         if self.state == "COUNTDOWN":
             now = pygame.time.get_ticks()
             timeLeft = 3000 - (now - self.countdown_start)
@@ -926,7 +949,7 @@ class Game:
                 color = GREEN
             
             # Big pulsing text
-            font_surf = self.large_font.render(txt, True, color)
+            font_surf = render_text(self.large_font, txt, color)
             # Scale up
             scale = 3.0
             if timeLeft > 0:
@@ -943,16 +966,68 @@ class Game:
         # Draw UI (Top Layer)
         self.screen.blit(self.close_btn, self.close_btn_rect)
 
-        pygame.display.flip()
-
-
+    def draw_replay_bar(self):
+        # Timeline along the bottom of the screen; click or drag to scrub
+        bar = self.replay_bar
+        panel = self.get_render_target('replay_panel', (self.screen_width, 110), fill=(0, 0, 0, 180))
+        self.screen.blit(panel, (0, self.screen_height - 110))
+
+        pygame.draw.rect(self.screen, GRAY, bar, border_radius=5)
+        fraction = self.race.tick / max(1, self.race.end_tick)
+        filled = bar.copy()
+        filled.width = int(bar.width * fraction)
+        if filled.width:
+            pygame.draw.rect(self.screen, GREEN, filled, border_radius=5)
+        pygame.draw.circle(self.screen, WHITE, (filled.right, bar.centery), 12)
+
+        status = "PAUSED" if self.replay_paused else f"{self.replay_speed:g}x"
+        label = f"REPLAY  {status}  {self.race.tick / FPS:.1f}s / {self.race.end_tick / FPS:.1f}s"
+        self.screen.blit(render_text(self.ui_font, label, WHITE), (bar.x, bar.y - 40))
+        keys = "Space: pause   Left/Right: 5s   Up/Down: speed   F: finish   Home/End   Esc: close"
+        text = render_text(self.font, keys, WHITE)
+        self.screen.blit(text, text.get_rect(topright=(bar.right, bar.y - 34)))
+
+    def get_background_plane(self, render_width, render_height):
+        """Background tiled over the viewport plus one tile, rebuilt only when it's too small."""
+        bg_w, bg_h = self.background_texture.get_size()
+        plane = self.render_targets.get('background')
+        if plane is None or plane.get_width() < render_width + bg_w or plane.get_height() < render_height + bg_h:
+            # Size for the full screen so zooming in never needs a rebuild
+            width = max(render_width, self.screen_width) + bg_w
+            height = max(render_height, self.screen_height) + bg_h
+            plane = pygame.Surface((width, height)).convert()
+            for x in range(0, width, bg_w):
+                for y in range(0, height, bg_h):
+                    plane.blit(self.background_texture, (x, y))
+            self.render_targets['background'] = plane
+        return plane
+
+    def get_render_target(self, name, size, like=None, fill=None):
+        """Offscreen surface kept across frames, rebuilt only when its size changes.
+
+        like: surface whose pixel format to copy (needed as a scale destination)
+        fill: colour to fill an alpha surface with once when it's created
+        """
+        surf = self.render_targets.get(name)
+        if surf is None or surf.get_size() != size:
+            if like is not None:
+                surf = pygame.Surface(size, 0, like)
+            elif fill is not None:
+                surf = pygame.Surface(size, pygame.SRCALPHA)
+                surf.fill(fill)
+            else:
+                surf = pygame.Surface(size)
+            self.render_targets[name] = surf
+        return surf
 
     def run(self):
         while True:
+            # Milliseconds the previous frame took
+            dt = self.clock.tick(FPS)
             self.handle_input()
-            self.update()
+            self.update(dt)
             self.draw()
-            self.clock.tick(FPS)
 
 if __name__ == "__main__":
-    Game().run()
+    # Usage: python gui_racing_lottery.py [race.rlog]  (a log opens straight into its replay)
+    Game(sys.argv[1] if len(sys.argv) > 1 else None).run()
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+try:
+    from PIL import Image
+except ImportError: # Pillow is optional here; pygame can decode too, just slower
+    Image = None
+
+# Random track photos, decoded and downscaled on a thread pool.
+# Workers return raw RGBA pixels; the final convert_alpha happens on the
+# thread that called load_photos (the game's loader thread). It only reads
+# the display's pixel format, which is safe there because the window is
+# created once, before that thread starts, and never re-created. Downscaled
+# pixels are written to a thumbnail cache keyed by path, mtime and target
+# size, so later launches skip decoding the originals altogether.
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '.cache', 'thumbs')
+THUMB_HEADER = struct.Struct('<II') # width, height
+
+
+def fit_size(w, h, max_size):
+    # Same rounding as the original in-game downscale
+    if w > max_size or h > max_size:
+        scale = max_size / max(w, h)
+        return int(w * scale), int(h * scale)
+    return w, h
+
+
+def thumb_path(cache_dir, path, max_size):
+    key = f"{os.path.abspath(path)}|{os.path.getmtime(path)}|{max_size}"
+    return os.path.join(cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.rgba')
+
+
+def decode(path, max_size):
+    """Decode and downscale one photo to ((w, h), RGBA bytes). Safe off the main thread."""
+    if Image is not None:
+        with Image.open(path) as img:
+            size = fit_size(img.width, img.height, max_size)
+            # JPEGs can decode straight at a fraction of full size
+            img.draft('RGB', size)
+            img = img.convert('RGBA')
+            if img.size != size:
+                img = img.resize(size, Image.BILINEAR)
+            return size, img.tobytes()
+    img = pygame.image.load(path)
+    size = fit_size(*img.get_size(), max_size)
+    if img.get_size() != size:
+        try:
+            img = pygame.transform.smoothscale(img, size)
+        except ValueError: # Palette images can't be smoothscaled
+            img = pygame.transform.scale(img, size)
+    return size, pygame.image.tobytes(img, 'RGBA')
+
+
+def load_thumb(path, max_size, cache_dir):
+    """Pixels for one photo, from the thumbnail cache or decoded and cached."""
+    cached = None
+    if cache_dir:
+        cached = thumb_path(cache_dir, path, max_size)
+        try:
+            with open(cached, 'rb') as f:
+                data = f.read()
+            size = THUMB_HEADER.unpack_from(data)
+            return size, data[THUMB_HEADER.size:]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Failed to read cached thumbnail for {path}: {e}")
+
+    size, pixels = decode(path, max_size)
+    if cached:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{cached}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(THUMB_HEADER.pack(*size) + pixels)
+            os.replace(tmp_path, cached)
+        except Exception as e:
+            print(f"Failed to write cached thumbnail for {path}: {e}")
+    return size, pixels
+
+
+def load_photos(paths, max_size, workers=None, cache_dir=CACHE_DIR):
+    """Load photos on a worker pool; returns [(path, surface)] in input order.
+
+    Photos that fail to load are reported and left out.
+    """
+    photos = []
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 4) as pool:
+        futures = [pool.submit(load_thumb, path, max_size, cache_dir) for path in paths]
+        for path, future in zip(paths, futures):
+            try:
+                size, pixels = future.result()
+                photos.append((path, pygame.image.frombytes(pixels, size, 'RGBA').convert_alpha()))
+            except Exception as e:
+                print(f"Failed to load photo {os.path.basename(path)}: {e}")
+    return photos
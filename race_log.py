@@ -0,0 +1,437 @@
+import json
+import os
+import struct
+import sys
+import zlib
+from bisect import bisect_right
+from collections import namedtuple
+
+import numpy as np
+
+from race_engine import RaceEvent, RaceSimulation, LaneIndex, ROSTER_STREAM, deal, lane_count, run_heats, stream_seed
+from roster import file_hash, load_roster
+from track import Track
+
+# Compact binary race log.
+# A log holds everything needed to re-run and re-show a race: the seed,
+# roster, settings and where the roster came from (the pool it was dealt
+# from and the CSV sample behind that) up front, then per-tick deltas
+# (progress changes, state changes, events, obstacles/boosters appearing and
+# being hit) and a full keyframe every KEYFRAME_TICKS ticks. Ticks are buffered and written
+# as one zlib chunk per keyframe interval while the race runs, and an index
+# of keyframe offsets at the end lets a reader jump straight to any tick.
+#
+# A TICKS chunk holds the progress deltas of all its ticks as one
+# (ticks x racers) int32 block split into byte planes, which compresses far
+# better than interleaved values, followed by the other per-tick records.
+#
+# Layout: chunks of (u8 type, u32 length, zlib payload), in the order
+#   HEADER, KEYFRAME(0), TICKS(1..K), KEYFRAME(K), TICKS(K+1..2K), ..., INDEX
+# followed by a trailer (u64 index offset, b'RIDX'). A log cut short by a
+# crash has no index but can still be read front to back.
+#
+# RaceReplay plays a log back for the GUI, seeking through the keyframes.
+
+MAGIC = b'RLOG'
+VERSION = 1
+TRAILER = struct.Struct('<Q4s')
+TRAILER_MAGIC = b'RIDX'
+CHUNK = struct.Struct('<BI')
+HEADER, TICKS, KEYFRAME, INDEX = range(4)
+
+KEYFRAME_TICKS = 120 # Two seconds of race time between keyframes
+PROGRESS_SCALE = 1 << 24 # Progress is stored as Q24 fixed point (~1/1000 px), exact across deltas
+
+EVENT_KINDS = ('obstacle', 'booster', 'finish', 'crash', 'boost')
+ITEM_KINDS = ('obstacle', 'booster')
+ITEM_OPS = ('add', 'remove')
+
+TICK_HEAD = struct.Struct('<IIII') # tick, state changes, events, item changes
+TICKS_HEAD = struct.Struct('<II') # ticks, racers
+ITEM_CHANGE = struct.Struct('<BBIdIH') # op, kind, id, progress, lane, variant
+KEYFRAME_HEAD = struct.Struct('<IIII') # tick, racers, finished, items
+ITEM = struct.Struct('<BIdIH') # kind, id, progress, lane, variant
+
+TickRecord = namedtuple('TickRecord', ['tick', 'progress_delta', 'state_racers', 'state_values', 'events', 'items'])
+Keyframe = namedtuple('Keyframe', ['tick', 'progress', 'state', 'finished', 'items'])
+
+
+def quantize(progress):
+    return np.rint(np.asarray(progress) * PROGRESS_SCALE).astype(np.int64)
+
+
+class RaceRecorder:
+    """Streams a RaceSimulation to a log file; call record() after every step."""
+    def __init__(self, path, race, pool=None, heats=None, roster_source=None):
+        self.file = open(path, 'wb')
+        self.path = path
+        self.keyframes = []
+        self.buffer = []
+        self.deltas = []
+        self.seen_events = len(race.events)
+        self.prev_progress = quantize(race.progress)
+        self.prev_state = race.state.copy()
+
+        self.file.write(MAGIC + struct.pack('<H', VERSION))
+        header = {
+            "seed": int(race.seed),
+            "roster": race.names,
+            "settings": race.settings,
+            "track_contestants": race.track.num_contestants,
+            "obstacle_variants": race.obstacle_variants,
+            "booster_variants": race.booster_variants,
+            "keyframe_ticks": KEYFRAME_TICKS,
+        }
+        if pool is not None:
+            # Enough to re-deal the pool and re-run any heats that picked this roster
+            header["pool"] = list(pool)
+            header["dealt"] = True
+        if heats:
+            header["heats"] = [{"entrants": len(entrants), "winner": winner} for entrants, winner in heats]
+        if roster_source:
+            # CSV hash, sample settings and seed, and who was drawn earlier:
+            # enough to check the pool against the CSV it was sampled from
+            header["roster_source"] = roster_source
+        self.write_chunk(HEADER, json.dumps(header, ensure_ascii=False).encode('utf-8'))
+        self.write_keyframe(race)
+
+    def write_chunk(self, kind, payload):
+        offset = self.file.tell()
+        data = zlib.compress(payload, 6)
+        self.file.write(CHUNK.pack(kind, len(data)) + data)
+        return offset
+
+    def write_keyframe(self, race):
+        items = [(k, item) for k, index in enumerate((race.obstacles, race.boosters)) for item in index]
+        parts = [
+            KEYFRAME_HEAD.pack(race.tick, race.num_racers, len(race.finished_racers), len(items)),
+            quantize(race.progress).astype(np.uint32).tobytes(),
+            race.state.astype(np.int8).tobytes(),
+            np.array(race.finished_racers, dtype=np.uint32).tobytes(),
+        ]
+        parts += [ITEM.pack(k, item['id'], item['progress'], item['lane'], item['variant']) for k, item in items]
+        self.keyframes.append((race.tick, self.write_chunk(KEYFRAME, b''.join(parts))))
+
+    def record(self, race):
+        progress = quantize(race.progress)
+        delta = (progress - self.prev_progress).astype(np.int32)
+        self.prev_progress = progress
+        changed = np.flatnonzero(race.state != self.prev_state)
+        self.prev_state = race.state.copy()
+        events = race.events[self.seen_events:]
+        self.seen_events = len(race.events)
+
+        parts = [
+            TICK_HEAD.pack(race.tick, len(changed), len(events), len(race.item_changes)),
+            changed.astype(np.uint32).tobytes(),
+            race.state[changed].astype(np.int8).tobytes(),
+            bytes(EVENT_KINDS.index(e.kind) for e in events),
+            np.array([e.racer for e in events], dtype=np.uint32).tobytes(),
+        ]
+        parts += [ITEM_CHANGE.pack(ITEM_OPS.index(op), ITEM_KINDS.index(kind), item['id'],
+                                   item['progress'], item['lane'], item['variant'])
+                  for op, kind, item in race.item_changes]
+        self.buffer.append(b''.join(parts))
+        self.deltas.append(delta)
+
+        if race.tick % KEYFRAME_TICKS == 0:
+            self.flush()
+            self.write_keyframe(race)
+        if race.is_finished:
+            self.close()
+
+    def flush(self):
+        if self.buffer:
+            deltas = np.array(self.deltas, dtype='<i4')
+            planes = deltas.view(np.uint8).reshape(-1, 4).T.tobytes()
+            self.write_chunk(TICKS, TICKS_HEAD.pack(*deltas.shape) + planes + b''.join(self.buffer))
+            self.buffer = []
+            self.deltas = []
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        index = np.array(self.keyframes, dtype=np.uint64).tobytes()
+        offset = self.write_chunk(INDEX, index)
+        self.file.write(TRAILER.pack(offset, TRAILER_MAGIC))
+        self.file.close()
+
+
+class RaceLog:
+    """Reader for a race log: header, keyframe index and tick records."""
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        if self.data[:4] != MAGIC:
+            raise ValueError(f"{path} is not a race log")
+        version, = struct.unpack_from('<H', self.data, 4)
+        if version != VERSION:
+            raise ValueError(f"{path} has unsupported version {version}")
+
+        kind, payload, _ = self.read_chunk(6)
+        self.header = json.loads(payload)
+        self.num_racers = len(self.header["roster"])
+        self.keyframes = self.read_index()
+
+    def read_chunk(self, offset):
+        """(type, payload, next offset) of the chunk at offset."""
+        kind, length = CHUNK.unpack_from(self.data, offset)
+        start = offset + CHUNK.size
+        return kind, zlib.decompress(self.data[start:start + length]), start + length
+
+    def chunks(self, offset=None):
+        offset = 6 if offset is None else offset
+        end = len(self.data)
+        if self.data[-4:] == TRAILER_MAGIC:
+            end -= TRAILER.size
+        while offset + CHUNK.size <= end:
+            try:
+                kind, payload, next_offset = self.read_chunk(offset)
+            except (zlib.error, struct.error):
+                return # Truncated tail of a log that was never closed
+            yield offset, kind, payload
+            offset = next_offset
+
+    def read_index(self):
+        if self.data[-4:] == TRAILER_MAGIC:
+            offset, _ = TRAILER.unpack_from(self.data, len(self.data) - TRAILER.size)
+            _, payload, _ = self.read_chunk(offset)
+            return [tuple(int(v) for v in pair) for pair in np.frombuffer(payload, dtype=np.uint64).reshape(-1, 2)]
+        # No index: find the keyframes by walking the chunks
+        return [(self.parse_keyframe(payload).tick, offset)
+                for offset, kind, payload in self.chunks() if kind == KEYFRAME]
+
+    def parse_keyframe(self, payload):
+        tick, n, num_finished, num_items = KEYFRAME_HEAD.unpack_from(payload)
+        pos = KEYFRAME_HEAD.size
+        progress = np.frombuffer(payload, np.uint32, n, pos).astype(np.int64)
+        pos += 4 * n
+        state = np.frombuffer(payload, np.int8, n, pos).copy()
+        pos += n
+        finished = np.frombuffer(payload, np.uint32, num_finished, pos).tolist()
+        pos += 4 * num_finished
+        items = []
+        for _ in range(num_items):
+            items.append(ITEM.unpack_from(payload, pos))
+            pos += ITEM.size
+        return Keyframe(tick, progress, state, finished, items)
+
+    def parse_ticks(self, payload):
+        num_ticks, n = TICKS_HEAD.unpack_from(payload)
+        pos = TICKS_HEAD.size
+        size = num_ticks * n * 4
+        planes = np.frombuffer(payload, np.uint8, size, pos).reshape(4, -1)
+        deltas = np.ascontiguousarray(planes.T).view('<i4').reshape(num_ticks, n)
+        pos += size
+        for delta in deltas:
+            tick, num_states, num_events, num_items = TICK_HEAD.unpack_from(payload, pos)
+            pos += TICK_HEAD.size
+            state_racers = np.frombuffer(payload, np.uint32, num_states, pos)
+            pos += 4 * num_states
+            state_values = np.frombuffer(payload, np.int8, num_states, pos)
+            pos += num_states
+            kinds = payload[pos:pos + num_events]
+            pos += num_events
+            racers = np.frombuffer(payload, np.uint32, num_events, pos).tolist()
+            pos += 4 * num_events
+            events = [(EVENT_KINDS[k], r) for k, r in zip(kinds, racers)]
+            items = []
+            for _ in range(num_items):
+                op, kind, item_id, progress, lane, variant = ITEM_CHANGE.unpack_from(payload, pos)
+                items.append((ITEM_OPS[op], ITEM_KINDS[kind], item_id, progress, lane, variant))
+                pos += ITEM_CHANGE.size
+            yield TickRecord(tick, delta, state_racers, state_values, events, items)
+
+    def ticks(self, offset=None):
+        """Every tick record from the chunk at offset (default: the start) onwards."""
+        for _, kind, payload in self.chunks(offset):
+            if kind == TICKS:
+                yield from self.parse_ticks(payload)
+
+
+class RaceReplay:
+    """Plays a race log back through the attributes the GUI reads off a
+    RaceSimulation (names, lanes, draw_x/draw_y, state, rank, obstacles, ...).
+
+    seek() starts from the nearest keyframe at or before the tick and applies
+    fewer than KEYFRAME_TICKS tick records, so any moment of the race is the
+    same small amount of work away. step() applies the next record in order.
+    """
+    def __init__(self, log, track=None):
+        self.log = log
+        header = log.header
+        self.settings = header["settings"]
+        self.track = track or Track(self.settings.get("screen_height", 1080), header["track_contestants"])
+        self.names = header["roster"]
+        self.num_racers = n = len(self.names)
+        self.racer_ids = np.arange(n)
+        self.num_lanes = lane_count(n, self.settings)
+        self.lanes = self.racer_ids % self.num_lanes
+        self.rank = np.arange(n)
+        self.x = self.y = None
+
+        self.keyframe_ticks = [tick for tick, _ in log.keyframes]
+        # One pass for the last recorded tick and the tick the winner finished on
+        self.end_tick = self.keyframe_ticks[-1]
+        self.winner_tick = None
+        for record in log.ticks():
+            self.end_tick = record.tick
+            if self.winner_tick is None and any(kind == 'finish' for kind, _ in record.events):
+                self.winner_tick = record.tick
+        self.seek(0)
+
+    @property
+    def is_finished(self):
+        return len(self.finished_racers) == self.num_racers
+
+    # Read-side helpers shared with the live engine
+    state_name = RaceSimulation.state_name
+    interpolate = RaceSimulation.interpolate
+    standings = RaceSimulation.standings
+
+    def update_ranking(self):
+        # Same ranking as a single-heat RaceSimulation
+        self.order = np.argsort(-self.progress, kind='stable')
+        self.rank[self.order] = self.racer_ids
+        self.leader = int(self.order[0])
+
+    def seek(self, tick):
+        """Jump to tick (clamped to the recorded range)."""
+        tick = max(0, min(int(tick), self.end_tick))
+        _, offset = self.log.keyframes[bisect_right(self.keyframe_ticks, tick) - 1]
+        _, payload, next_offset = self.log.read_chunk(offset)
+        frame = self.log.parse_keyframe(payload)
+
+        self.tick = frame.tick
+        self.progress_q = frame.progress.copy()
+        self.state = frame.state.copy()
+        self.finished_racers = list(frame.finished)
+        self.finished = np.zeros(self.num_racers, dtype=bool)
+        self.finished[self.finished_racers] = True
+        self.obstacles = LaneIndex()
+        self.boosters = LaneIndex()
+        self.items = {} # (kind, id) -> item dict
+        for kind, item_id, progress, lane, variant in frame.items:
+            self.add_item(ITEM_KINDS[kind], item_id, progress, lane, variant)
+
+        self.records = self.log.ticks(next_offset)
+        while self.tick < tick:
+            if not self.apply(next(self.records, None)):
+                break
+        self.update_positions()
+        # Nothing to interpolate from after a jump
+        self.prev_x, self.prev_y = self.x, self.y
+
+    def step(self):
+        """Advance one recorded tick and return its events."""
+        if self.tick >= self.end_tick:
+            return []
+        record = next(self.records, None)
+        if not self.apply(record):
+            self.end_tick = self.tick
+            return []
+        self.update_positions()
+        return [RaceEvent(record.tick, kind, racer) for kind, racer in record.events]
+
+    def apply(self, record):
+        if record is None:
+            return False
+        self.tick = record.tick
+        self.progress_q += record.progress_delta
+        self.state[record.state_racers] = record.state_values
+        for kind, racer in record.events:
+            if kind == 'finish':
+                self.finished_racers.append(racer)
+                self.finished[racer] = True
+        for op, kind, item_id, progress, lane, variant in record.items:
+            if op == 'add':
+                self.add_item(kind, item_id, progress, lane, variant)
+            else:
+                item = self.items.pop((kind, item_id))
+                (self.obstacles if kind == 'obstacle' else self.boosters).remove(item)
+        return True
+
+    def add_item(self, kind, item_id, progress, lane, variant):
+        x, y, _ = self.track.get_position(progress, lane, self.num_lanes)
+        item = {'id': item_id, 'progress': progress, 'lane': lane, 'variant': variant, 'x': x, 'y': y}
+        (self.obstacles if kind == 'obstacle' else self.boosters).add(item)
+        self.items[(kind, item_id)] = item
+
+    def update_positions(self):
+        self.progress = self.progress_q / PROGRESS_SCALE
+        self.prev_x, self.prev_y = self.x, self.y
+        self.x, self.y, self.angle = self.track.get_positions(self.progress, self.lanes, self.num_lanes)
+        self.draw_x, self.draw_y = self.x, self.y
+        self.update_ranking()
+
+
+def simulate(header):
+    """Re-create the race a log header describes, ready to step."""
+    settings = header["settings"]
+    track = Track(settings.get("screen_height", 1080), header["track_contestants"])
+    return RaceSimulation(header["roster"], settings, seed=header["seed"], track=track,
+                          obstacle_variants=header["obstacle_variants"],
+                          booster_variants=header["booster_variants"])
+
+
+def check_roster_source(header):
+    """None if the logged pool is what sampling the CSV gives, else what's wrong."""
+    source = header["roster_source"]
+    path = source["csv"]
+    if not os.path.exists(path):
+        return f"roster CSV {path} not found"
+    if file_hash(path) != source["sha1"]:
+        return f"roster CSV {path} has changed since the race"
+    roster = load_roster(path, sample_size=source["sample_size"], weighted=source["weighted"],
+                         seed=stream_seed(source["seed"], ROSTER_STREAM), cache_dir=None)
+    pool = [c.name for c in roster]
+    for name in source["drawn"]:
+        if name not in pool:
+            return f"earlier winner {name} was not in the sample"
+        pool.remove(name)
+    if pool != header["pool"]:
+        return "sampling the roster CSV gives a different pool"
+    return None
+
+
+def verify(path):
+    """Re-run a logged race from its seed and check every recorded tick matches.
+
+    Logs that record where their pool came from are also checked from the
+    CSV sample through the deal and heats to the final roster.
+    """
+    log = RaceLog(path)
+    header = log.header
+    if "roster_source" in header:
+        problem = check_roster_source(header)
+        if problem:
+            return False, problem
+    if "pool" in header:
+        # Older logs only kept the pool for heats and didn't deal it
+        entrants = deal(header["pool"], header["seed"]) if header.get("dealt") else header["pool"]
+        finalists, _ = run_heats(entrants, header["settings"], seed=header["seed"])
+        if finalists != header["roster"]:
+            return False, "the deal and heats picked a different final roster"
+
+    race = simulate(header)
+    progress = quantize(race.progress)
+    for record in log.ticks():
+        race.step()
+        progress = progress + record.progress_delta
+        if record.tick != race.tick or not np.array_equal(progress, quantize(race.progress)):
+            return False, f"mismatch at tick {race.tick}"
+    if not race.is_finished:
+        return False, f"log ends at tick {race.tick} before the race finished"
+    return True, f"winner={race.names[race.finished_racers[0]]} ticks={race.tick}"
+
+
+if __name__ == "__main__":
+    # Usage: python race_log.py race.rlog [...]
+    ok = True
+    for path in sys.argv[1:]:
+        passed, message = verify(path)
+        ok &= passed
+        print(f"{path}: {'OK' if passed else 'FAILED'} {message}")
+    sys.exit(0 if ok else 1)
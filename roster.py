@@ -0,0 +1,172 @@
+import csv
+import hashlib
+import heapq
+import math
+import os
+import random
+import struct
+from collections import namedtuple
+
+# Contestant roster loading for big HR exports.
+# The CSV is read one row at a time: rows are deduplicated by ID (when the
+# file has an ID column), filtered on an optional eligibility column and fed
+# straight into a reservoir, so only the sample (plus a small digest per seen
+# ID) is ever held in memory.
+# The parsed rows are also streamed into a compact binary file keyed by the
+# CSV's hash, which later launches read instead of parsing the CSV again.
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '.cache', 'roster')
+CACHE_VERSION = 3 # Bump when the parsing rules or file layout change
+CACHE_MAGIC = b'RSTR'
+
+# Accepted header names, compared lower-cased with spaces/dashes as underscores
+ID_COLUMNS = ('id', 'employee_id', 'staff_id', 'ticket_id')
+NAME_COLUMNS = ('name', 'full_name')
+WEIGHT_COLUMNS = ('weight', 'tickets', 'ticket_weight')
+ELIGIBLE_COLUMNS = ('eligible', 'eligibility')
+NOT_ELIGIBLE = ('0', 'false', 'no', 'n')
+
+RECORD = struct.Struct('<dII') # weight (exact, so sampling matches the CSV), id length, name length in bytes
+
+Contestant = namedtuple('Contestant', ['id', 'name', 'weight'])
+
+
+def file_hash(filepath):
+    h = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _column(header, aliases):
+    for i, col in enumerate(header):
+        if col.strip().lower().replace(' ', '_').replace('-', '_') in aliases:
+            return i
+    return None
+
+
+def iter_csv(filepath):
+    """Yield eligible Contestants from a CSV, one row at a time.
+
+    The header picks the columns: a name column (else the first column), and
+    optional ID, ticket weight and eligibility columns. Rows repeating an
+    earlier ID, marked not eligible or with a weight of zero or less are
+    skipped. Without an ID column the name stands in as the ID, but nothing
+    is deduplicated, since two people can share a name.
+    """
+    with open(filepath, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None) or []
+        name_col = _column(header, NAME_COLUMNS) or 0
+        id_col = _column(header, ID_COLUMNS)
+        weight_col = _column(header, WEIGHT_COLUMNS)
+        eligible_col = _column(header, ELIGIBLE_COLUMNS)
+
+        seen = set() # 8-byte digests rather than the IDs themselves
+        duplicates = 0
+        for row in reader:
+            if len(row) <= name_col or not row[name_col].strip():
+                continue
+            name = row[name_col].strip()
+            cid = row[id_col].strip() if id_col is not None and id_col < len(row) else name
+            if eligible_col is not None and eligible_col < len(row):
+                if row[eligible_col].strip().lower() in NOT_ELIGIBLE:
+                    continue
+            weight = 1.0
+            if weight_col is not None and weight_col < len(row):
+                try:
+                    weight = float(row[weight_col])
+                except ValueError:
+                    pass # Blank or junk counts as one ticket
+                if not weight > 0: # Also catches NaN
+                    continue
+
+            if id_col is not None:
+                digest = hashlib.blake2b(cid.encode('utf-8'), digest_size=8).digest()
+                if digest in seen:
+                    duplicates += 1
+                    continue
+                seen.add(digest)
+            yield Contestant(cid, name, weight)
+        if duplicates:
+            print(f"Skipped {duplicates} row(s) repeating an earlier ID in {filepath}")
+
+
+def iter_cache(path):
+    with open(path, 'rb') as f:
+        if f.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+            raise ValueError("not a roster cache file")
+        read = f.read
+        while True:
+            head = read(RECORD.size)
+            if not head:
+                return
+            weight, id_len, name_len = RECORD.unpack(head)
+            yield Contestant(read(id_len).decode('utf-8'), read(name_len).decode('utf-8'), weight)
+
+
+def _cached_rows(rows, path):
+    """Pass rows through while writing them to a cache file, kept only if the pass completes."""
+    tmp_path = path + '.tmp'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        out = open(tmp_path, 'wb')
+    except OSError as e:
+        print(f"Failed to write roster cache: {e}")
+        yield from rows
+        return
+    with out:
+        out.write(CACHE_MAGIC)
+        for c in rows:
+            cid = c.id.encode('utf-8')
+            name = c.name.encode('utf-8')
+            out.write(RECORD.pack(c.weight, len(cid), len(name)) + cid + name)
+            yield c
+    os.replace(tmp_path, path)
+
+
+def reservoir_sample(rows, k, weighted=False, rng=None):
+    """Pick k rows in one pass, uniformly or in proportion to their weight.
+
+    Each row gets the key u ** (1 / weight) (Efraimidis-Spirakis) and the k
+    largest keys win; with every weight taken as 1 that is a uniform sample.
+    Only k rows are held at a time.
+    """
+    rng = rng or random.Random()
+    heap = [] # (key, arrival, row) min-heap of the current sample
+    for n, row in enumerate(rows):
+        u = rng.random()
+        if weighted:
+            # log(u) / weight orders the same as u ** (1 / weight) without underflowing
+            key = math.log(u) / row.weight if u > 0 else -math.inf
+        else:
+            key = u
+        if len(heap) < k:
+            heapq.heappush(heap, (key, n, row))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, n, row))
+    return [row for _, n, row in sorted(heap, key=lambda item: item[1])]
+
+
+def load_roster(filepath, sample_size=0, weighted=False, seed=None, cache_dir=CACHE_DIR, csv_hash=None):
+    """Eligible, deduplicated contestants from a CSV, sampled down to sample_size.
+
+    sample_size 0 keeps everyone; the same seed and file always sample the
+    same rows. Reads the binary cache for this exact file content when there
+    is one, otherwise parses the CSV and writes it. csv_hash saves hashing
+    the file again when the caller already has file_hash(filepath).
+    """
+    rows = None
+    if cache_dir:
+        path = os.path.join(cache_dir, f"{csv_hash or file_hash(filepath)}_v{CACHE_VERSION}.bin")
+        if os.path.exists(path):
+            rows = iter_cache(path)
+        else:
+            rows = _cached_rows(iter_csv(filepath), path)
+    if rows is None:
+        rows = iter_csv(filepath)
+
+    if sample_size and sample_size > 0:
+        return reservoir_sample(rows, int(sample_size), weighted, random.Random(seed))
+    return list(rows)
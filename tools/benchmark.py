@@ -0,0 +1,279 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError: # Windows; peak RSS comes from psapi instead
+    resource = None
+
+# Headless benchmark of the race screen.
+# Every field size runs in a fresh process under SDL's dummy video driver,
+# with a fixed race seed so each run draws the same race. Per field size it
+# times building the track and composing its whole texture, constructing the
+# Racer sprites from cold caches, and then frames of Game.update + Game.draw,
+# with and without zoom. Results are written as JSON and compared against a
+# saved baseline.
+#
+# Usage: python tools/benchmark.py [--racers 10 60 500 5000] [--save-baseline]
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import numpy as np
+import pygame
+
+import asset_cache
+from gui_racing_lottery import Game
+from race_engine import TICK_MS, lane_count
+
+RACER_COUNTS = (10, 60, 500, 5000)
+DEFAULT_SEED = 1234
+DEFAULT_OUTPUT = os.path.join(ROOT_DIR, 'benchmark.json')
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, 'benchmark_baseline.json')
+DEFAULT_THRESHOLD = 0.15
+NOISE_FLOOR = 1.0 # ms or MB; smaller changes never count as regressions
+
+# (section, key) pairs compared against the baseline; None is the top level
+METRICS = (
+    ("track_texture", "build_ms"),
+    ("track_texture", "all_tiles_ms"),
+    ("racer_construction", "cold_ms"),
+    ("no_zoom", "p50_ms"),
+    ("no_zoom", "p95_ms"),
+    ("no_zoom", "p99_ms"),
+    ("zoom", "p50_ms"),
+    ("zoom", "p95_ms"),
+    ("zoom", "p99_ms"),
+    (None, "peak_rss_mb"),
+)
+
+
+class BenchmarkGame(Game):
+    """Game with the benchmark's settings laid over settings.json."""
+    overrides = {}
+
+    def load_settings(self):
+        settings = super().load_settings()
+        settings.update(self.overrides)
+        return settings
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+    import ctypes
+    from ctypes import wintypes
+
+    class Counters(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + \
+                   [(name, ctypes.c_size_t) for name in (
+                       "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                       "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                       "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+    counters = Counters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb)
+    return counters.PeakWorkingSetSize / (1024 * 1024)
+
+
+def elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+def frame_stats(times):
+    times = np.asarray(times)
+    p50, p95, p99 = np.percentile(times, [50, 95, 99])
+    return {
+        "frames": len(times),
+        "mean_ms": round(float(times.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(times.max()), 3),
+    }
+
+
+def time_frames(game, frames, warmup, zoom):
+    """Race from the start line for warmup + frames frames; stats of the timed ones."""
+    game.start_race()
+    game.countdown_start -= 3001
+    game.update(TICK_MS) # Countdown over, racing from the next frame
+
+    # Hold the zoom the finish screen uses so the scaled render path is timed
+    game.zoom_level = zoom
+    times = []
+    for _ in range(warmup + frames):
+        start = time.perf_counter()
+        game.update(TICK_MS) # Exactly one tick per frame
+        game.draw()
+        times.append((time.perf_counter() - start) * 1000)
+        if game.state != "RACING":
+            break
+    game.reset_to_menu()
+    return frame_stats(times[warmup:])
+
+
+def run_field(num_racers, frames, warmup, seed):
+    """Benchmark one field size in this process; returns its results."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        BenchmarkGame.overrides = {
+            "race_seed": seed,
+            "heat_size": 0, # Time the race itself, not heats
+            "race_log_dir": "",
+            "track_cache_dir": os.path.join(cache_dir, 'startup'),
+        }
+        game = BenchmarkGame()
+        game.wait_until_loaded()
+        game.contestants = [f"Racer {i + 1}" for i in range(num_racers)]
+
+        # Empty texture cache: composing the track is timed cold, then
+        # frames read tiles back from it like a normal launch
+        game.settings["track_cache_dir"] = os.path.join(cache_dir, 'track')
+
+        start = time.perf_counter()
+        game.build_track(lane_count(num_racers, game.settings), wait=True)
+        build_ms = elapsed_ms(start)
+        texture = game.track_texture
+        start = time.perf_counter()
+        for index in range(texture.num_tiles):
+            texture.save_cached_tile(index, texture.build_tile(index))
+        track_texture = {"build_ms": build_ms, "all_tiles_ms": elapsed_ms(start), "tiles": texture.num_tiles}
+
+        game.start_race()
+        asset_cache.clear_sprites()
+        start = time.perf_counter()
+        game.build_racers()
+        cold_ms = elapsed_ms(start)
+        start = time.perf_counter()
+        game.build_racers()
+        racer_construction = {"cold_ms": cold_ms, "warm_ms": elapsed_ms(start)}
+        game.reset_to_menu()
+
+        result = {
+            "racers": num_racers,
+            "track_texture": track_texture,
+            "racer_construction": racer_construction,
+            "no_zoom": time_frames(game, frames, warmup, 1.0),
+            "zoom": time_frames(game, frames, warmup, game.settings.get("winning_car_zoom", 1.5)),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+        pygame.quit()
+    return result
+
+
+def run(racer_counts, frames, warmup, seed):
+    results = {}
+    for num_racers in racer_counts:
+        # A fresh process per field, so caches and peak RSS are its own
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(run_field, num_racers, frames, warmup, seed).result()
+        results[str(num_racers)] = result
+        print(f"{num_racers:>5} racers: "
+              f"frame p50/p95/p99 {result['no_zoom']['p50_ms']:.1f}/{result['no_zoom']['p95_ms']:.1f}/"
+              f"{result['no_zoom']['p99_ms']:.1f} ms, "
+              f"zoomed {result['zoom']['p50_ms']:.1f}/{result['zoom']['p95_ms']:.1f}/"
+              f"{result['zoom']['p99_ms']:.1f} ms, "
+              f"track {result['track_texture']['all_tiles_ms']:.0f} ms, "
+              f"racers {result['racer_construction']['cold_ms']:.0f} ms, "
+              f"peak RSS {result['peak_rss_mb']:.0f} MB")
+    return {
+        "meta": {
+            "seed": seed,
+            "frames": frames,
+            "warmup": warmup,
+            "time": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Print every metric next to the baseline; returns the ones that got slower than threshold."""
+    for key in ("seed", "frames", "warmup"):
+        if current["meta"].get(key) != baseline["meta"].get(key):
+            print(f"Warning: baseline was run with {key}={baseline['meta'].get(key)}")
+
+    regressions = []
+    for field, result in current["results"].items():
+        base = baseline["results"].get(field)
+        if base is None:
+            print(f"{field:>5} racers: not in the baseline")
+            continue
+        for section, key in METRICS:
+            new = result[section][key] if section else result[key]
+            old = base[section][key] if section else base[key]
+            if not old:
+                continue
+            name = f"{section}.{key}" if section else key
+            change = (new - old) / old
+            flag = ""
+            if change > threshold and new - old > NOISE_FLOOR:
+                flag = "  REGRESSION"
+                regressions.append((field, name, old, new))
+            print(f"{field:>5} racers {name:<32} {old:10.2f} -> {new:10.2f} ({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless race screen benchmark")
+    parser.add_argument("--racers", type=int, nargs="+", default=list(RACER_COUNTS))
+    parser.add_argument("--frames", type=int, default=600, help="timed frames per run")
+    parser.add_argument("--warmup", type=int, default=60, help="untimed frames before them")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"relative slowdown that counts as a regression (default {DEFAULT_THRESHOLD})")
+    args = parser.parse_args()
+
+    # settings.json and contestants.csv are read relative to the repo root
+    os.chdir(ROOT_DIR)
+    current = run(args.racers, args.frames, args.warmup, args.seed)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(current, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} metric(s) more than {args.threshold:.0%} slower than the baseline")
+        return 1
+    print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,89 +1,140 @@
+import json
 import os
 import random
 import shutil
-from PIL import Image, ExifTags
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
 
+VALID_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp')
+MANIFEST_NAME = 'manifest.json'
 
 
-def copyRandomPhotos(source_dir, dest_dir, num_photos):
+def walkPhotos(source_dir):
+    """
+    yield every photo path under source_dir, subfolders included
+    """
+    stack = [source_dir]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError as e:
+            print(f"Skipping unreadable folder: {e}")
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif entry.name.lower().endswith(VALID_EXTENSIONS):
+                yield entry.path
+
+
+def reservoirSample(paths, k, rng=random):
+    """
+    pick k paths uniformly at random in a single pass, holding only k at a time
+    returns (sample, number of paths seen)
+    """
+    sample = []
+    seen = 0
+    for path in paths:
+        seen += 1
+        if len(sample) < k:
+            sample.append(path)
+        else:
+            j = rng.randrange(seen)
+            if j < k:
+                sample[j] = path
+    return sample, seen
+
+
+def ingestPhoto(photo_path, dest_path, max_size):
+    """
+    decode one photo, apply its EXIF orientation, downscale it to fit max_size and write it once
+    runs in a worker process; returns the manifest entry
+    """
+    with Image.open(photo_path) as image:
+        # JPEGs can decode at a fraction of full size; leave headroom for the resize
+        image.draft('RGB', (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size))
+        if dest_path.lower().endswith('.png'):
+            image.save(dest_path)
+        else:
+            image.convert('RGB').save(dest_path, quality=90)
+        size = image.size
+    return {"file": os.path.basename(dest_path), "source": photo_path, "size": list(size)}
+
+
+def destName(photo_path, used):
+    # The game reads .png/.jpg/.jpeg; everything else is written as JPEG
+    base, extension = os.path.splitext(os.path.basename(photo_path))
+    extension = extension.lower()
+    if extension not in ('.png', '.jpg', '.jpeg'):
+        extension = '.jpg'
+    file_name = base + extension
+
+    # Handle filename collisions
+    counter = 1
+    while file_name.lower() in used:
+        file_name = f"{base}_{counter}{extension}"
+        counter += 1
+    used.add(file_name.lower())
+    return file_name
+
+
+def copyRandomPhotos(source_dir, dest_dir, num_photos, max_size=600, workers=None, seed=None):
     """
     copy a specified number of random photos from source_dir to dest_dir
     the source dir can contain subfolders, also search within those subfolders to select a number of random photos
-    the dest_dir will contain only the selected photos (no subfolders)
+    the dest_dir will contain only the selected photos (no subfolders), oriented upright and scaled to fit max_size,
+    plus a manifest.json listing where each one came from
     """
-    valid_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp')
-    all_photos = []
-
-    for root, _, files in os.walk(source_dir):
-        for file in files:
-            if file.lower().endswith(valid_extensions):
-                all_photos.append(os.path.join(root, file))
+    rng = random.Random(seed)
+    selected_photos, seen = reservoirSample(walkPhotos(source_dir), num_photos, rng)
 
-    if not all_photos:
+    if not selected_photos:
         print(f"No photos found in {source_dir}")
         return
 
-    num_to_copy = min(len(all_photos), num_photos)
-    selected_photos = random.sample(all_photos, num_to_copy)
-
     if os.path.exists(dest_dir):
         shutil.rmtree(dest_dir)
     os.makedirs(dest_dir)
 
-    for photo_path in selected_photos:
-        file_name = os.path.basename(photo_path)
-        dest_path = os.path.join(dest_dir, file_name)
-
-        # Handle filename collisions
-        base, extension = os.path.splitext(file_name)
-        counter = 1
-        while os.path.exists(dest_path):
-            dest_path = os.path.join(dest_dir, f"{base}_{counter}{extension}")
-            counter += 1
-
-        shutil.copy2(photo_path, dest_path)
-        fixPhotoOrientation(dest_path)
-
-def fixPhotoOrientation(photo_path):
-    """
-    Fix the orientation of a photo based on its EXIF data.
-    """
-    try:
-        with Image.open(photo_path) as image:
-            for orientation in ExifTags.TAGS.keys():
-                if ExifTags.TAGS[orientation] == 'Orientation':
-                    break
-            
-            exif = image._getexif()
-            if exif is None:
-                return
-
-            orientation_value = exif.get(orientation)
-            
-            if orientation_value == 3:
-                image = image.rotate(180, expand=True)
-            elif orientation_value == 6:
-                image = image.rotate(270, expand=True)
-            elif orientation_value == 8:
-                image = image.rotate(90, expand=True)
-            else:
-                return
-
-            image.save(photo_path)
-            
-    except (AttributeError, KeyError, IndexError):
-        # cases: image don't have getexif
-        pass
-    except Exception as e:
-        print(f"Error fixing orientation for {photo_path}: {e}")
+    used = set()
+    jobs = [(photo_path, os.path.join(dest_dir, destName(photo_path, used))) for photo_path in selected_photos]
+
+    photos = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(ingestPhoto, photo_path, dest_path, max_size) for photo_path, dest_path in jobs]
+        for (photo_path, _), future in zip(jobs, futures):
+            try:
+                photos.append(future.result())
+            except Exception as e:
+                print(f"Error processing {photo_path}: {e}")
+
+    manifest = {
+        "source_dir": source_dir,
+        "photos_seen": seen,
+        "max_size": max_size,
+        "seed": seed,
+        "photos": photos,
+    }
+    with open(os.path.join(dest_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    print(f"Copied {len(photos)} of {seen} photos to {dest_dir}")
 
 
 if __name__ == "__main__":
-    
+
     ASSETS_DIR = os.path.join(os.path.dirname(__file__).split("racing-lottery-app")[0], 'racing-lottery-app', 'assets')
     RANDOM_PHOTOS_DIR = os.path.join(ASSETS_DIR, 'random_photos')
     RANDOM_PHOTOS_SOURCE_DIR = r"C:\Users\tsont\OneDrive - Group GSA\GSA Photos"
 
-    # Copy random photos if not already done
-    copyRandomPhotos(RANDOM_PHOTOS_SOURCE_DIR, RANDOM_PHOTOS_DIR, 300)
+    # Scale to what the game will show anyway
+    try:
+        with open(os.path.join(os.path.dirname(ASSETS_DIR), 'settings.json'), 'r') as f:
+            max_size = json.load(f).get("random_photos_max_size", 600)
+    except Exception as e:
+        print(f"Error loading settings: {e}")
+        max_size = 600
 
+    # Copy random photos if not already done
+    copyRandomPhotos(RANDOM_PHOTOS_SOURCE_DIR, RANDOM_PHOTOS_DIR, 300, max_size)
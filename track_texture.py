@@ -0,0 +1,368 @@
+import hashlib
+import json
+import math
+import os
+import random
+import shutil
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from asset_cache import LRUCache
+from track import TRACK_LENGTH
+
+# Track texture split into fixed-width vertical tiles.
+# Where everything goes (banners, photos, road/sidewalk circles) is worked
+# out once up front, but pixels are only composed for a tile when the camera
+# gets near it, on a builder thread, and only a few tiles stay resident. The
+# render thread blits the tiles that are ready and never composes one itself.
+# Composed tiles are also written to a cache directory keyed by everything
+# that affects their pixels, so later launches read each tile back in one go
+# instead of rebuilding it.
+# A key's tiles take about 160 MB, so only the newest key is kept on disk.
+
+Y_PADDING = 800 # Extra space above and below the screen to avoid clipping
+TRACK_TEXTURE_WIDTH = TRACK_LENGTH + 500
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '.cache', 'track')
+CACHE_VERSION = 1 # Bump when the composition code changes
+
+# Settings that change what the track looks like
+TEXTURE_SETTINGS = (
+    "screen_height", "banner_distance", "banner_scale", "random_photos_scale",
+    "random_photos_interval", "random_photos_frequency", "random_photos_max_size",
+    "random_photos_offset", "track_tile_width",
+)
+
+
+def texture_cache_key(settings, track_width, seed, asset_paths):
+    """Hash of the settings, track width, seed and asset mtimes behind a texture."""
+    assets = []
+    for path in asset_paths:
+        try:
+            assets.append((os.path.basename(path), os.path.getmtime(path)))
+        except OSError:
+            assets.append((os.path.basename(path), None))
+    data = {
+        "version": CACHE_VERSION,
+        "settings": {k: settings.get(k) for k in TEXTURE_SETTINGS},
+        "track_width": track_width,
+        "seed": seed,
+        "assets": assets,
+    }
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class TrackTexture:
+    def __init__(self, track, settings, screen_height, road_texture, sidewalk_texture,
+                 banner_texture, random_photos, asset_paths=()):
+        self.track = track
+        self.settings = settings
+        # Photo placement is seeded so a cached texture can be reproduced
+        self.seed = settings.get("track_seed", 0)
+        self.rng = random.Random(self.seed)
+        self.road_texture = road_texture
+        self.sidewalk_texture = sidewalk_texture
+        self.random_photos = random_photos
+
+        self.width = TRACK_TEXTURE_WIDTH
+        self.height = screen_height + 2 * Y_PADDING
+        self.tile_width = int(settings.get("track_tile_width", 1024))
+        self.num_tiles = int(math.ceil(self.width / self.tile_width))
+
+        # Enough tiles for a full screen plus the one coming into view
+        visible = int(math.ceil(settings.get("screen_width", 1920) / self.tile_width)) + 2
+        self.tiles = LRUCache(max(visible, int(settings.get("track_tile_cache", 6))))
+        self.builder = ThreadPoolExecutor(max_workers=1)
+        self.pending = {} # index -> Future of a tile being composed or read back
+
+        self.cache_dir = None
+        self.cache_root = settings.get("track_cache_dir", CACHE_DIR)
+        if self.cache_root:
+            key = texture_cache_key(settings, track.track_width, self.seed, asset_paths)
+            self.cache_dir = os.path.join(self.cache_root, key)
+
+        road_radius = int(track.track_width / 2)
+        sidewalk_width_extra = 40
+        self.road_radius = road_radius
+        self.sidewalk_radius = road_radius + sidewalk_width_extra
+
+        # Road shape: circles at every other vertex for smooth joints
+        self.circles = []
+        for i in range(0, len(track.points), 2):
+            pt = track.points[i]
+            draw_y = int(pt[1] + Y_PADDING)
+            if draw_y > -self.sidewalk_radius and draw_y < self.height + self.sidewalk_radius:
+                self.circles.append((int(pt[0]), draw_y))
+        self.circle_xs = [c[0] for c in self.circles]
+
+        # Props on the bottom layer: (image, center, half_extent), sorted by x
+        self.props = self.place_photos() + self.place_banners(banner_texture)
+        self.props.sort(key=lambda p: p[1][0])
+        self.prop_xs = [p[1][0] for p in self.props]
+        self.max_prop_extent = max((p[2] for p in self.props), default=0)
+
+    def place_photos(self):
+        # --- Sprinkle Random Photos ---
+        # Walk along the track and place a photo every ~interval pixels
+        props = []
+        if not self.random_photos:
+            return props
+
+        p_points = self.track.points
+        offset_val = self.settings.get("random_photos_offset", 30)
+        safe_dist = self.sidewalk_radius + offset_val # Minimum distance from center
+        max_dist = safe_dist + 300 # Maximum distance from center
+
+        freq_base = self.settings.get("random_photos_interval", self.settings.get("random_photos_frequency", 500))
+        # Ensure safe bounds
+        if freq_base < 50: freq_base = 50
+        base_scale = self.settings.get("random_photos_scale", 1.0)
+
+        current_dist = 0
+        next_photo_dist = self.rng.randint(int(freq_base * 0.5), int(freq_base * 1.5))
+
+        for i in range(0, len(p_points) - 1):
+            p1 = p_points[i]
+            p2 = p_points[i+1]
+
+            seg_dx = p2[0] - p1[0]
+            seg_dy = p2[1] - p1[1]
+            current_dist += math.sqrt(seg_dx*seg_dx + seg_dy*seg_dy)
+
+            if current_dist >= next_photo_dist:
+                current_dist = 0
+                next_photo_dist = self.rng.randint(int(freq_base * 0.5), int(freq_base * 1.5)) # Space them out
+
+                # Random photo with scale variation
+                photo = self.rng.choice(self.random_photos)
+                scale_var = self.rng.uniform(0.8, 1.2) * base_scale
+                w, h = photo.get_size()
+                t_size = (int(w * scale_var), int(h * scale_var))
+
+                # Random side
+                side = 1 if self.rng.random() > 0.5 else -1
+                dist = self.rng.uniform(safe_dist, max_dist)
+
+                perp_angle = math.atan2(seg_dy, seg_dx) + math.pi / 2
+                px = p1[0] + math.cos(perp_angle) * dist * side
+                py = p1[1] + Y_PADDING + math.sin(perp_angle) * dist * side
+
+                # Scaled lazily when a tile needs it
+                props.append(((photo, t_size, 0), (int(px), int(py)), max(t_size) // 2 + 1))
+        return props
+
+    def place_banners(self, banner_texture):
+        # Place banner center right at the edge of the sidewalk
+        # Drawing order will hide the inner half
+        props = []
+        offset_dist = self.sidewalk_radius + 15 # Slight text offset
+
+        banner_dist_setting = self.settings.get("banner_distance", 50)
+        banner_scale_setting = self.settings.get("banner_scale", 1.0)
+
+        bw, bh = banner_texture.get_size()
+        scaled_banner = pygame.transform.scale(banner_texture, (int(bw * banner_scale_setting), int(bh * banner_scale_setting)))
+        sw, sh = scaled_banner.get_size()
+        extent = int(math.hypot(sw, sh) / 2) + 1
+
+        points = self.track.points
+        accumulated_dist = 0
+        last_banner_dist = -banner_dist_setting
+
+        for i in range(0, len(points) - 1):
+            p1 = points[i]
+            p2 = points[i+1]
+
+            seg_dx = p2[0] - p1[0]
+            seg_dy = p2[1] - p1[1]
+            accumulated_dist += math.sqrt(seg_dx*seg_dx + seg_dy*seg_dy)
+
+            if accumulated_dist - last_banner_dist >= banner_dist_setting:
+                last_banner_dist = accumulated_dist
+
+                angle = math.atan2(seg_dy, seg_dx)
+                perp_angle = angle + math.pi / 2
+                draw_x = p1[0]
+                draw_y = p1[1] + Y_PADDING
+                # Rotate banner (Convert radians to degrees, negative for pygame)
+                deg = -math.degrees(angle)
+                ox = math.cos(perp_angle) * offset_dist
+                oy = math.sin(perp_angle) * offset_dist
+
+                # Left and right side banners
+                props.append(((scaled_banner, None, deg), (int(draw_x + ox), int(draw_y + oy)), extent))
+                props.append(((scaled_banner, None, deg), (int(draw_x - ox), int(draw_y - oy)), extent))
+        return props
+
+    def load_tile(self, index):
+        # Runs on the builder thread
+        tile = self.load_cached_tile(index)
+        if tile is None:
+            tile = self.build_tile(index)
+            self.save_cached_tile(index, tile)
+        return tile
+
+    def ready_tile(self, index):
+        """The tile if it is resident; otherwise queue it on the builder and return None."""
+        tile = self.tiles.get(index)
+        if tile is None and index not in self.pending:
+            self.pending[index] = self.builder.submit(self.load_tile, index)
+        return tile
+
+    def collect(self, first, last):
+        """Move finished tiles into the LRU and cancel queued ones far from the view.
+
+        Only tiles from first - 1 to last + 1 are kept; anything else finishing
+        after a jump is dropped, so memory stays at the LRU plus a few tiles.
+        """
+        for index, future in list(self.pending.items()):
+            near = first - 1 <= index <= last + 1
+            if future.done():
+                del self.pending[index]
+                if not near or future.cancelled():
+                    continue
+                try:
+                    self.tiles.put(index, future.result())
+                except Exception as e:
+                    print(f"Failed to build track tile {index}: {e}")
+            elif not near and future.cancel():
+                del self.pending[index]
+
+    def warm(self, cam_x, view_w, wait=False):
+        """Queue the tiles a view starting at cam_x will need first.
+
+        wait blocks until they are resident, for the loader thread.
+        """
+        first = max(0, int(cam_x // self.tile_width))
+        last = min(self.num_tiles - 1, int((cam_x + view_w) // self.tile_width) + 1)
+        for index in range(first, last + 1):
+            self.ready_tile(index)
+        if wait:
+            for index in range(first, last + 1):
+                future = self.pending.get(index)
+                if future is not None:
+                    future.exception() # Waits; failures are reported by collect
+            self.collect(first, last)
+
+    def close(self):
+        """Drop queued tiles and let the builder thread exit."""
+        self.builder.shutdown(wait=False, cancel_futures=True)
+        self.pending.clear()
+
+    def tile_path(self, index):
+        return os.path.join(self.cache_dir, f"tile_{index}.rgba")
+
+    def load_cached_tile(self, index):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self.tile_path(index), 'rb') as f:
+                data = f.read()
+            tile_x = index * self.tile_width
+            size = (min(self.tile_width, self.width - tile_x), self.height)
+            return pygame.image.frombytes(data, size, 'RGBA').convert_alpha()
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Failed to read cached track tile {index}: {e}")
+            return None
+
+    def save_cached_tile(self, index, tile):
+        if not self.cache_dir:
+            return
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+                self.prune_cache()
+            path = self.tile_path(index)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                # Raw pixels: a read is much cheaper than decompressing
+                f.write(pygame.image.tobytes(tile, 'RGBA'))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Failed to write cached track tile {index}: {e}")
+
+    def prune_cache(self):
+        # Drop the tiles of every other key; anything not named like a key is left alone
+        current = os.path.basename(self.cache_dir)
+        try:
+            names = os.listdir(self.cache_root)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.cache_root, name)
+            if name == current or len(name) != 16 or not os.path.isdir(path):
+                continue
+            if all(c in '0123456789abcdef' for c in name):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def build_tile(self, index):
+        tile_x = index * self.tile_width
+        width = min(self.tile_width, self.width - tile_x)
+        height = self.height
+        x_min = tile_x
+        x_max = tile_x + width
+
+        # 1. Tiled road and sidewalk, aligned to the global texture grid
+        road_surf = self.tiled(self.road_texture, tile_x, width, height)
+        sidewalk_surf = self.tiled(self.sidewalk_texture, tile_x, width, height)
+
+        # 2. Banner/photo layer (bottom)
+        final_surf = pygame.Surface((width, height), pygame.SRCALPHA)
+        lo = bisect_left(self.prop_xs, x_min - self.max_prop_extent)
+        hi = bisect_right(self.prop_xs, x_max + self.max_prop_extent)
+        for (image, size, deg), (cx, cy), extent in self.props[lo:hi]:
+            if cx + extent < x_min or cx - extent > x_max:
+                continue
+            if size is not None:
+                image = pygame.transform.scale(image, size)
+            if deg:
+                image = pygame.transform.rotate(image, deg)
+            final_surf.blit(image, image.get_rect(center=(cx - tile_x, cy)))
+
+        # 3. Masks for road and sidewalk
+        road_mask = pygame.Surface((width, height), pygame.SRCALPHA)
+        road_mask.fill((0, 0, 0, 0))
+        sidewalk_mask = pygame.Surface((width, height), pygame.SRCALPHA)
+        sidewalk_mask.fill((0, 0, 0, 0))
+
+        lo = bisect_left(self.circle_xs, x_min - self.sidewalk_radius)
+        hi = bisect_right(self.circle_xs, x_max + self.sidewalk_radius)
+        for cx, cy in self.circles[lo:hi]:
+            pygame.draw.circle(sidewalk_mask, (255, 255, 255, 255), (cx - tile_x, cy), self.sidewalk_radius)
+            pygame.draw.circle(road_mask, (255, 255, 255, 255), (cx - tile_x, cy), self.road_radius)
+
+        sidewalk_surf.blit(sidewalk_mask, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+        road_surf.blit(road_mask, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+
+        # Combine: banners at the bottom, then sidewalk, then road on top
+        final_surf.blit(sidewalk_surf, (0, 0))
+        final_surf.blit(road_surf, (0, 0))
+        return final_surf
+
+    @staticmethod
+    def tiled(texture, tile_x, width, height):
+        surf = pygame.Surface((width, height), pygame.SRCALPHA)
+        tw, th = texture.get_size()
+        for x in range(-(tile_x % tw), width, tw):
+            for y in range(0, height, th):
+                surf.blit(texture, (x, y))
+        return surf
+
+    def draw(self, surface, cam_x, cam_y):
+        # Tiles are stored with Y_PADDING above the track's own coordinates
+        dest_y = -Y_PADDING - cam_y
+        view_w = surface.get_width()
+        first = max(0, int(cam_x // self.tile_width))
+        last = min(self.num_tiles - 1, int((cam_x + view_w) // self.tile_width))
+        self.collect(first, last)
+        for index in range(first, last + 1):
+            tile = self.ready_tile(index)
+            if tile is not None:
+                surface.blit(tile, (index * self.tile_width - cam_x, dest_y))
+
+        # Queue the next tile ahead of the camera before it scrolls into view
+        if last + 1 < self.num_tiles:
+            self.ready_tile(last + 1)